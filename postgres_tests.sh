@@ -0,0 +1,33 @@
+#!/bin/sh
+# Прогоняет все тесты на временном PostgreSQL, поднятом на этой машине.
+# Нужны initdb и pg_ctl (из PATH, PG_BIN или pg_config --bindir) и
+# psycopg2 в окружении. Запускать не от root: так требует PostgreSQL.
+# Аргументы передаются pytest.
+set -eu
+
+ROOT=$(cd "$(dirname "$0")" && pwd)
+PG_BIN=${PG_BIN:-$(pg_config --bindir 2>/dev/null || dirname "$(command -v pg_ctl)")}
+PORT=${DB_PORT:-54329}
+DATA=$(mktemp -d)
+
+stop() {
+    "$PG_BIN/pg_ctl" -D "$DATA" -m fast stop >/dev/null 2>&1 || true
+    rm -rf "$DATA"
+}
+trap stop EXIT INT TERM
+
+# Локаль с UTF-8 нужна to_tsvector, чтобы приводить кириллицу к нижнему
+# регистру.
+"$PG_BIN/initdb" -D "$DATA" -U yatube -A trust -E UTF8 \
+    --locale="${PG_LOCALE:-C.UTF-8}" >/dev/null
+"$PG_BIN/pg_ctl" -D "$DATA" -l "$DATA/server.log" -w \
+    -o "-p $PORT -k $DATA -c listen_addresses=''" start >/dev/null
+
+export DB_ENGINE=postgresql DB_NAME=yatube DB_USER=yatube DB_PASSWORD=
+export DB_HOST="$DATA" DB_PORT="$PORT"
+export SECRET_KEY="${SECRET_KEY:-postgres-tests}"
+
+cd "$ROOT"
+python -m pytest -q "$@"
+cd "$ROOT/yatube"
+python manage.py test
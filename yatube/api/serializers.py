@@ -0,0 +1,46 @@
+"""Представление моделей в ответах API: компактные словари."""
+from posts import images
+
+
+def _url(field):
+    return field.url if field else None
+
+
+def author_to_dict(user) -> dict:
+    return {
+        "username": user.username,
+        "name": user.get_full_name(),
+    }
+
+
+def group_to_dict(group) -> dict:
+    return {
+        "slug": group.slug,
+        "title": group.title,
+        "description": group.description,
+    }
+
+
+def post_to_dict(post) -> dict:
+    """Пост из feed.card_queryset(): читает только CARD_FIELDS."""
+    group = post.group
+    return {
+        "id": post.pk,
+        "text": post.text,
+        "created": post.created.isoformat(),
+        "author": author_to_dict(post.author),
+        "group": {"slug": group.slug, "title": group.title} if group else None,
+        "image": _url(post.image),
+        "thumbnail": post.thumbnail_url or None,
+        "variants": images.sources(post),
+    }
+
+
+def comment_to_dict(comment) -> dict:
+    return {
+        "id": comment.pk,
+        "post": comment.post_id,
+        "text": comment.text,
+        "created": comment.created.isoformat(),
+        "author": comment.author.username,
+    }
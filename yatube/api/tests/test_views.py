@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text="Текст поста %s" % post_num,
+                group=cls.group,
+            )
+            for post_num in range(25)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text="Комментарий"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_list_is_cursor_paginated(self):
+        url = reverse("api:post_list")
+        data = self.client.get(url).json()
+        seen = [post["id"] for post in data["results"]]
+        self.assertEqual(len(seen), 20)
+        self.assertIsNone(data["previous"])
+        data = self.client.get(data["next"]).json()
+        seen += [post["id"] for post in data["results"]]
+        self.assertIsNone(data["next"])
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)]
+        )
+        first = self.client.get(url).json()["results"][0]
+        self.assertEqual(first["author"]["username"], "author")
+        self.assertEqual(first["group"]["slug"], "test-slug")
+
+    def test_endpoints_respond(self):
+        urls = (
+            reverse("api:post_detail", kwargs={"post_id": self.posts[0].pk}),
+            reverse("api:comment_list", kwargs={"post_id": self.posts[0].pk}),
+            reverse("api:group_list"),
+            reverse("api:group_detail", kwargs={"slug": "test-slug"}),
+            reverse("api:group_post_list", kwargs={"slug": "test-slug"}),
+            reverse("api:profile_detail", kwargs={"username": "author"}),
+            reverse("api:profile_post_list", kwargs={"username": "author"}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertTrue(response.has_header("ETag"))
+        response = self.client.get(
+            reverse("api:group_detail", kwargs={"slug": "missing"})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_requires_login(self):
+        url = reverse("api:follow_list")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        self.assertEqual(len(self.client.get(url).json()["results"]), 20)
+
+    def test_not_modified_skips_listing_query(self):
+        url = reverse("api:post_list")
+        etag = self.client.get(url)["ETag"]
+        # Счётчик постов и ключ самой новой записи — без выборки страницы.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_content(self):
+        url = reverse("api:post_list")
+        etag = self.client.get(url)["ETag"]
+        post = self.posts[10]
+        post.text = "Новый текст"
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        Post.objects.create(author=self.author, text="Свежий пост")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["text"], "Свежий пост")
+
+    def test_etag_changes_with_group_and_author_names(self):
+        """Названия групп и имена авторов входят в ответ: ETag меняется."""
+        url = reverse("api:post_list")
+        etag = self.client.get(url)["ETag"]
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Новое название"
+        group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Алексей"
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,188 @@
+"""
+Чтение лент в JSON: /api/v1/.
+
+Списки отдаются курсорными страницами (posts.pagination.CursorPaginator).
+Ответ на список несёт сильный ETag, который считается до выборки страницы
+по дешёвым данным: ключу самой новой записи ленты (одна строка по
+индексу), счётчику из posts.counters и общей версии лент posts.cards.
+Версию меняют приёмники сигналов в posts.signals: своих приёмников у
+API нет. Поэтому на If-None-Match с прежним значением 304 отдаётся без
+выборки страницы. Одиночные объекты маленькие, их ETag — хеш тела ответа.
+"""
+import hashlib
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_GET
+
+from posts import cards, counters, feed
+from posts.models import Group, Post
+from posts.pagination import CursorPaginator
+
+from . import serializers
+
+User = get_user_model()
+
+PER_PAGE = 20
+
+
+def _json(data, status=200) -> JsonResponse:
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={"separators": (",", ":"), "ensure_ascii": False},
+    )
+
+
+def _conditional(request, data):
+    """Ответ с ETag по содержимому; 304, если клиент его уже видел."""
+    response = _json(data)
+    set_response_etag(response)
+    return get_conditional_response(
+        request, etag=response["ETag"], response=response
+    )
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(
+        request.path + "?" + urlencode({"cursor": cursor})
+    )
+
+
+def _newest(queryset) -> list:
+    """Ключ сортировки первой записи выборки."""
+    fields = [name.lstrip("-") for name in queryset.query.order_by]
+    return list(queryset.values_list(*fields)[:1])
+
+
+def api_login_required(view):
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({"detail": "Требуется авторизация."}, status=401)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def listing(source, serialize):
+    """
+    Представление списка. source(request, **kwargs) возвращает выборку с
+    заданной сортировкой и список дешёвых значений, от которых зависит
+    ETag (например, счётчик записей: удаление меняет его).
+    """
+
+    def get_listing(request, **kwargs):
+        # Выборку нужны и ETag, и самому представлению: строим один раз.
+        if not hasattr(request, "_api_listing"):
+            request._api_listing = source(request, **kwargs)
+        return request._api_listing
+
+    def etag(request, **kwargs):
+        queryset, version = get_listing(request, **kwargs)
+        raw = json.dumps(
+            [
+                request.get_full_path(),
+                request.user.pk,
+                _newest(queryset),
+                version,
+                cards.listing_stamp(),
+            ],
+            default=str,
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    @require_GET
+    @condition(etag_func=etag)
+    def view(request, **kwargs):
+        queryset, _ = get_listing(request, **kwargs)
+        page = CursorPaginator(queryset, PER_PAGE).get_page(
+            request.GET.get("cursor")
+        )
+        return _json(
+            {
+                "results": [serialize(obj) for obj in page],
+                "next": _page_url(request, page.next_cursor),
+                "previous": _page_url(request, page.previous_cursor),
+            }
+        )
+
+    return view
+
+
+def _index_posts(request):
+    return feed.index_posts(), [counters.post_count()]
+
+
+def _group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return (
+        feed.group_posts(group),
+        [counters.post_count(group_id=group.pk)],
+    )
+
+
+def _author_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return (
+        feed.author_posts(author),
+        [counters.post_count(author_id=author.pk)],
+    )
+
+
+def _follow_posts(request):
+    # Отписка убирает из ленты посты автора, удаление поста меняет общий
+    # счётчик: оба значения входят в ETag.
+    return (
+        feed.follow_posts(request.user),
+        [request.user.follower.count(), counters.post_count()],
+    )
+
+
+def _post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    return feed.post_comments(post.pk), [counters.comment_count(post.pk)]
+
+
+def _groups(request):
+    return Group.objects.order_by("pk"), [Group.objects.count()]
+
+
+post_list = listing(_index_posts, serializers.post_to_dict)
+group_post_list = listing(_group_posts, serializers.post_to_dict)
+profile_post_list = listing(_author_posts, serializers.post_to_dict)
+follow_list = api_login_required(
+    listing(_follow_posts, serializers.post_to_dict)
+)
+comment_list = listing(_post_comments, serializers.comment_to_dict)
+group_list = listing(_groups, serializers.group_to_dict)
+
+
+@require_GET
+def post_detail(request, post_id):
+    post = get_object_or_404(feed.card_queryset(), pk=post_id)
+    data = serializers.post_to_dict(post)
+    data["comments_count"] = counters.comment_count(post.pk)
+    return _conditional(request, data)
+
+
+@require_GET
+def group_detail(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = serializers.group_to_dict(group)
+    data["posts_count"] = counters.post_count(group_id=group.pk)
+    return _conditional(request, data)
+
+
+@require_GET
+def profile_detail(request, username):
+    author = get_object_or_404(User, username=username)
+    data = serializers.author_to_dict(author)
+    data["posts_count"] = counters.post_count(author_id=author.pk)
+    data["followers_count"] = author.following.count()
+    return _conditional(request, data)
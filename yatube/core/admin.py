@@ -0,0 +1,30 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = (
+        "sql",
+        "callsite",
+        "calls",
+        "max_ms",
+        "total_ms",
+        "last_seen",
+    )
+    search_fields = ("sql", "callsite")
+    readonly_fields = (
+        "fingerprint",
+        "sql",
+        "callsite",
+        "plan",
+        "calls",
+        "total_ms",
+        "max_ms",
+        "first_seen",
+        "last_seen",
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks, slowlog, sqlite  # noqa: F401
+
+        sqlite.install()
+        slowlog.install()
@@ -0,0 +1,142 @@
+"""
+Проверки настроек, от которых зависит производительность.
+
+Запускаются вместе с проверками безопасности:
+`manage.py check --deploy` или только они —
+`manage.py check --deploy --tag performance`.
+"""
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.checks import Warning, register
+from django.utils.module_loading import import_string
+
+TAG = "performance"
+
+COMPRESSION_MIDDLEWARE = (
+    "django.middleware.gzip.GZipMiddleware",
+    "core.middleware.CompressionMiddleware",
+)
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def _uses_cached_loader(engine) -> bool:
+    loaders = engine.get("OPTIONS", {}).get("loaders")
+    if loaders is None:
+        # Без явных loaders Django включает кэш сам, когда debug выключен.
+        return not engine.get("OPTIONS", {}).get("debug", settings.DEBUG)
+    return any(
+        isinstance(loader, (list, tuple))
+        and loader[0] == "django.template.loaders.cached.Loader"
+        for loader in loaders
+    )
+
+
+@register(TAG, deploy=True)
+def check_debug(app_configs, **kwargs):
+    warnings = []
+    if settings.DEBUG:
+        warnings.append(
+            Warning(
+                "DEBUG включён: каждый SQL-запрос копится в "
+                "connection.queries, шаблоны разбираются заново.",
+                hint="YATUBE_ENV=prod",
+                id="performance.W001",
+            )
+        )
+    if "debug_toolbar" in settings.INSTALLED_APPS:
+        warnings.append(
+            Warning(
+                "debug_toolbar установлен: его middleware работает на "
+                "каждом запросе.",
+                hint="Подключайте его только в профиле dev.",
+                id="performance.W002",
+            )
+        )
+    return warnings
+
+
+@register(TAG, deploy=True)
+def check_templates(app_configs, **kwargs):
+    for engine in settings.TEMPLATES:
+        if (
+            engine["BACKEND"].endswith(".DjangoTemplates")
+            and not _uses_cached_loader(engine)
+        ):
+            return [
+                Warning(
+                    "Шаблоны разбираются на каждом запросе.",
+                    hint="Включите кэширующий загрузчик: TEMPLATE_CACHE=1.",
+                    id="performance.W003",
+                )
+            ]
+    return []
+
+
+@register(TAG, deploy=True)
+def check_databases(app_configs, **kwargs):
+    warnings = []
+    for alias, database in settings.DATABASES.items():
+        if not database.get("CONN_MAX_AGE"):
+            warnings.append(
+                Warning(
+                    f"База {alias}: соединение открывается на каждый "
+                    "запрос.",
+                    hint="Задайте DB_CONN_MAX_AGE больше нуля.",
+                    id="performance.W004",
+                )
+            )
+        if (
+            database["ENGINE"] == "django.db.backends.sqlite3"
+            and settings.SQLITE_PRAGMAS.get("journal_mode") != "wal"
+        ):
+            warnings.append(
+                Warning(
+                    f"База {alias}: SQLite без WAL блокирует чтение на "
+                    "время записи.",
+                    hint='SQLITE_PRAGMAS["journal_mode"] = "wal"',
+                    id="performance.W005",
+                )
+            )
+    return warnings
+
+
+@register(TAG, deploy=True)
+def check_static_and_compression(app_configs, **kwargs):
+    warnings = []
+    storage = import_string(settings.STATICFILES_STORAGE)
+    if not issubclass(storage, ManifestFilesMixin):
+        warnings.append(
+            Warning(
+                "Имена файлов статики без хеша: браузеры не могут кэшировать "
+                "их надолго.",
+                hint="core.storage.CompressedManifestStaticFilesStorage",
+                id="performance.W006",
+            )
+        )
+    if not set(COMPRESSION_MIDDLEWARE) & set(settings.MIDDLEWARE):
+        warnings.append(
+            Warning(
+                "Ответы отдаются без сжатия.",
+                hint="Добавьте core.middleware.CompressionMiddleware.",
+                id="performance.W007",
+            )
+        )
+    return warnings
+
+
+@register(TAG, deploy=True)
+def check_cache(app_configs, **kwargs):
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PER_PROCESS_CACHES:
+        return [
+            Warning(
+                "Кэш живёт в памяти процесса: у каждого воркера свои "
+                "карточки, счётчики и версии лент.",
+                hint="CACHE_BACKEND=file или memcached.",
+                id="performance.W008",
+            )
+        ]
+    return []
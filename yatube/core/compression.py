@@ -0,0 +1,46 @@
+"""
+Сжатие gzip и brotli.
+
+brotli — необязательная зависимость (пакет brotli): без него сжатие
+ограничивается gzip.
+"""
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Форматы, которые и так сжаты: повторное сжатие только тратит время.
+COMPRESSIBLE_EXTENSIONS = (
+    ".css", ".js", ".map", ".svg", ".html", ".txt", ".json", ".xml", ".ico",
+)
+BROTLI_QUALITY = 11
+GZIP_LEVEL = 9
+
+
+def accepts(accept_encoding: str, coding: str) -> bool:
+    """Принимает ли клиент кодировку coding по заголовку Accept-Encoding."""
+    return re.search(rf"\b{re.escape(coding)}\b", accept_encoding) is not None
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    # mtime=0: одинаковое содержимое даёт одинаковый архив.
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def brotli_bytes(data: bytes, quality=BROTLI_QUALITY) -> bytes:
+    return brotli.compress(data, quality=quality)
+
+
+def variants(data: bytes) -> dict:
+    """{суффикс: сжатые данные} для тех способов, что уменьшают размер."""
+    found = {".gz": gzip_bytes(data)}
+    if brotli is not None:
+        found[".br"] = brotli_bytes(data)
+    return {
+        suffix: compressed
+        for suffix, compressed in found.items()
+        if len(compressed) < len(data)
+    }
@@ -0,0 +1,93 @@
+import hashlib
+import random
+import time
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from posts import cards
+
+
+def cache_validators(get_last_modified):
+    """
+    Валидаторы кэша для страниц анонимных пользователей.
+
+    get_last_modified(request, *args, **kwargs) одним дешёвым запросом
+    возвращает время последнего изменения страницы или None. Если клиент
+    прислал If-Modified-Since/If-None-Match и страница не менялась,
+    представление не вызывается: сразу отдаётся 304. ETag и Last-Modified
+    дополнительно учитывают общую версию лент (posts.cards) и время её
+    смены: правка и удаление постов не меняют время последнего поста, но
+    меняют страницу. Политику Cache-Control выставляет
+    core.middleware.AnonymousCacheMiddleware.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            last_modified = get_last_modified(request, *args, **kwargs)
+            if last_modified is None:
+                return view(request, *args, **kwargs)
+            timestamp = max(
+                timegm(last_modified.utctimetuple()),
+                int(cards.listing_changed()),
+            )
+            raw = f"{last_modified.isoformat()}:{cards.listing_stamp()}"
+            etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(timestamp)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def retry_when_locked(view):
+    """
+    Выполняет представление в транзакции и повторяет её, если SQLite
+    ответил «database is locked».
+
+    busy_timeout ждёт чужую запись, но не спасает транзакцию, которая
+    начала с чтения и пытается писать после того, как другой процесс
+    успел записать: SQLite сразу отвечает ошибкой. Такую транзакцию
+    можно только начать заново. Внутри уже открытой транзакции повторять
+    нечего — представление вызывается как есть.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if connection.in_atomic_block:
+            return view(request, *args, **kwargs)
+        attempt = 0
+        while True:
+            try:
+                with transaction.atomic():
+                    return view(request, *args, **kwargs)
+            except OperationalError as error:
+                attempt += 1
+                if (
+                    "locked" not in str(error)
+                    or attempt > settings.DB_LOCK_RETRIES
+                ):
+                    raise
+            delay = settings.DB_LOCK_RETRY_DELAY * 2 ** (attempt - 1)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+    return wrapper
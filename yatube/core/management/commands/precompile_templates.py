@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import template_cache
+
+
+class Command(BaseCommand):
+    help = "Разбирает все шаблоны проекта и сообщает о синтаксических ошибках."
+
+    def handle(self, *args, **options):
+        parsed, errors = template_cache.precompile()
+        if errors:
+            lines = [f"{name}: {error}" for name, error in errors.items()]
+            raise CommandError("Ошибки в шаблонах:\n" + "\n".join(lines))
+        cached = "да" if settings.TEMPLATE_CACHE else "нет"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Разобрано шаблонов: {parsed} "
+                f"(кэширующий загрузчик: {cached})"
+            )
+        )
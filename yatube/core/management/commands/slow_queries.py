@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Выводит журнал медленных SQL-запросов с планами выполнения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Сколько форм запросов."
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Очистить журнал."
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(
+                self.style.SUCCESS(f"Удалено записей: {deleted}")
+            )
+            return
+        for query in SlowQuery.objects.all()[: options["limit"]]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{query.calls} × до {query.max_ms:.1f} мс "
+                    f"(всего {query.total_ms:.1f} мс)"
+                )
+            )
+            self.stdout.write(query.sql)
+            if query.callsite:
+                self.stdout.write(f"  вызов: {query.callsite}")
+            for line in query.plan.splitlines():
+                self.stdout.write(f"  план: {line}")
+            self.stdout.write("")
@@ -0,0 +1,269 @@
+"""
+Метрики запросов: время ответа, SQL, отрисовка шаблонов и кэш.
+
+MetricsMiddleware (core.middleware) заводит на запрос RequestStats и
+кладёт его в contextvar. SQL считается через connection.execute_wrapper,
+шаблоны и кэш — обёртками, которые install() один раз ставит на
+Template.render бэкенда Django и get/get_many бэкенда кэша. По окончании
+запроса запись уходит в лог yatube.metrics (одна JSON-строка) и в
+гистограммы REGISTRY, которые /metrics отдаёт в текстовом формате
+Prometheus. Гистограммы живут в памяти процесса: каждый воркер
+отдаёт свои.
+"""
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger("yatube.metrics")
+
+current = contextvars.ContextVar("request_stats", default=None)
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    __slots__ = (
+        "started",
+        "sql_count",
+        "sql_time",
+        "template_time",
+        "template_depth",
+        "cache_hits",
+        "cache_misses",
+        "cache_depth",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """(le, накопленное число) по всем корзинам, включая +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    METRICS = {
+        "yatube_request_duration_seconds": (
+            "Время обработки запроса.",
+            SECONDS_BUCKETS,
+        ),
+        "yatube_sql_duration_seconds": (
+            "Суммарное время SQL-запросов за запрос.",
+            SECONDS_BUCKETS,
+        ),
+        "yatube_sql_queries": (
+            "Число SQL-запросов за запрос.",
+            QUERY_BUCKETS,
+        ),
+        "yatube_template_duration_seconds": (
+            "Время отрисовки шаблонов за запрос.",
+            SECONDS_BUCKETS,
+        ),
+    }
+    COUNTERS = {
+        "yatube_cache_hits_total": "Попадания в кэш.",
+        "yatube_cache_misses_total": "Промахи кэша.",
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {name: {} for name in self.METRICS}
+        self.counters = {name: {} for name in self.COUNTERS}
+
+    def record(self, view, values, hits, misses):
+        with self.lock:
+            for name, value in values.items():
+                series = self.histograms[name]
+                if view not in series:
+                    series[view] = Histogram(self.METRICS[name][1])
+                series[view].observe(value)
+            for name, value in (
+                ("yatube_cache_hits_total", hits),
+                ("yatube_cache_misses_total", misses),
+            ):
+                series = self.counters[name]
+                series[view] = series.get(view, 0) + value
+
+    def total(self, name, view) -> tuple:
+        """(сумма, число наблюдений) гистограммы name для view."""
+        with self.lock:
+            histogram = self.histograms[name].get(view)
+            if histogram is None:
+                return 0.0, 0
+            return histogram.sum, sum(histogram.counts)
+
+    def exposition(self) -> str:
+        """Текстовый формат Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.METRICS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for view, histogram in sorted(self.histograms[name].items()):
+                    label = _label(view)
+                    for bound, total in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{view="{label}",le="{bound}"}} '
+                            f"{total}"
+                        )
+                    lines.append(
+                        f'{name}_sum{{view="{label}"}} {histogram.sum:.6f}'
+                    )
+                    lines.append(f'{name}_count{{view="{label}"}} {total}')
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for view, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{{view="{_label(view)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def finish(stats, view, status) -> None:
+    """Записывает завершённый запрос в лог и гистограммы."""
+    duration = time.perf_counter() - stats.started
+    REGISTRY.record(
+        view,
+        {
+            "yatube_request_duration_seconds": duration,
+            "yatube_sql_duration_seconds": stats.sql_time,
+            "yatube_sql_queries": stats.sql_count,
+            "yatube_template_duration_seconds": stats.template_time,
+        },
+        stats.cache_hits,
+        stats.cache_misses,
+    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            json.dumps(
+                {
+                    "view": view,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                    "sql_count": stats.sql_count,
+                    "sql_ms": round(stats.sql_time * 1000, 2),
+                    "template_ms": round(stats.template_time * 1000, 2),
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                },
+                separators=(",", ":"),
+            )
+        )
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        stats = current.get()
+        if stats is None:
+            return render(self, *args, **kwargs)
+        # Вложенная отрисовка (render_to_string из тега) уже учтена внешней.
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+    wrapper.metrics_installed = True
+    return wrapper
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        value = get(self, key, default, *args, **kwargs)
+        stats = current.get()
+        # get_many по умолчанию читает ключи через get: их считает он.
+        if stats is not None and not stats.cache_depth:
+            if value is default:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return value
+
+    wrapper.metrics_installed = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, *args, **kwargs):
+        keys = list(keys)
+        stats = current.get()
+        if stats is None:
+            return get_many(self, keys, *args, **kwargs)
+        stats.cache_depth += 1
+        try:
+            found = get_many(self, keys, *args, **kwargs)
+        finally:
+            stats.cache_depth -= 1
+        if not stats.cache_depth:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+
+    wrapper.metrics_installed = True
+    return wrapper
+
+
+def install() -> None:
+    """Ставит обёртки на отрисовку шаблонов и чтение кэша (один раз)."""
+    from django.core.cache import caches
+    from django.template.backends.django import Template
+
+    if not getattr(Template.render, "metrics_installed", False):
+        Template.render = _timed_render(Template.render)
+    backend = type(caches["default"])
+    if not getattr(backend.get, "metrics_installed", False):
+        backend.get = _counted_get(backend.get)
+    if not getattr(backend.get_many, "metrics_installed", False):
+        backend.get_many = _counted_get_many(backend.get_many)
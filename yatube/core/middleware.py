@@ -0,0 +1,102 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import compression, metrics
+
+
+class MetricsMiddleware:
+    """
+    Замеряет каждый запрос (core.metrics): время, SQL, шаблоны, кэш.
+    Ставится первым, чтобы учесть и остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        metrics.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        metrics.finish(stats, view, response.status_code)
+        return response
+
+
+class AnonymousCacheMiddleware:
+    """
+    Разрешает браузерам и прокси кэшировать страницы с Last-Modified,
+    отданные анонимам. Авторизованным те же адреса выдают другую
+    страницу, поэтому ответ всегда варьируется по Cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ("GET", "HEAD") or not response.has_header(
+            "Last-Modified"
+        ):
+            return response
+        patch_vary_headers(response, ("Cookie",))
+        if response.has_header("Cache-Control"):
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE
+            )
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжимает ответы brotli, если клиент его принимает и установлен пакет
+    brotli; иначе — gzip, как django.middleware.gzip.GZipMiddleware.
+    Потоковые ответы (выгрузка) всегда сжимаются gzip.
+    """
+
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            compression.brotli is None
+            or response.streaming
+            or not compression.accepts(accept, "br")
+        ):
+            return super().process_response(request, response)
+        if response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < 200:
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = compression.brotli_bytes(
+            response.content, quality=self.brotli_quality
+        )
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        # Сжатое тело уже не побайтно то же: сильный ETag становится слабым.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
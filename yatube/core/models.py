@@ -14,3 +14,25 @@ class CreatedModel(models.Model):
 
         # Это абстрактная модель:
         abstract = True
+
+
+class SlowQuery(models.Model):
+    """Форма медленного SQL-запроса (core.slowlog) с планом выполнения."""
+
+    fingerprint = models.CharField("Отпечаток", max_length=40, unique=True)
+    sql = models.TextField("Запрос")
+    callsite = models.CharField("Откуда вызван", max_length=500, blank=True)
+    plan = models.TextField("План выполнения", blank=True)
+    calls = models.PositiveIntegerField("Медленных вызовов", default=1)
+    total_ms = models.FloatField("Суммарно, мс", default=0)
+    max_ms = models.FloatField("Максимум, мс", default=0)
+    first_seen = models.DateTimeField("Впервые", auto_now_add=True)
+    last_seen = models.DateTimeField("Последний раз", auto_now=True)
+
+    class Meta:
+        ordering = ("-total_ms",)
+        verbose_name = "Медленный запрос"
+        verbose_name_plural = "Медленные запросы"
+
+    def __str__(self) -> str:
+        return self.sql[:80]
@@ -0,0 +1,199 @@
+"""
+Журнал медленных SQL-запросов.
+
+install() подписывается на connection_created и ставит на каждое
+соединение обёртку execute_wrapper. Запросы дольше SLOW_QUERY_MS
+сводятся к форме (литералы и списки IN заменены на ?), и для каждой формы
+ведётся строка core.SlowQuery: число вызовов, суммарное и максимальное
+время, место вызова в коде проекта. План (EXPLAIN QUERY PLAN на SQLite,
+EXPLAIN на остальных) снимается один раз, когда форма встречается
+впервые. Смотреть — в админке или командой slow_queries.
+
+Во время запроса медленные запросы только копятся в памяти потока (не
+больше MAX_PENDING) и пишутся в журнал по сигналу request_finished, уже
+после ответа и вне транзакций представления: журнал не берёт блокировку
+записи посреди запроса и не теряет строки, если транзакция откатилась.
+Вне запросов (команды, воркеры) строки пишутся, как только соединение
+выходит из транзакции.
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 100
+
+_state = threading.local()
+# Формы, строки которых в этом процессе уже есть.
+_seen = set()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+# Обёртки замеров — не место вызова.
+_SKIP_FILES = {__file__, metrics.__file__}
+
+
+def normalize(sql: str) -> str:
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql.replace("%s", "?"))
+    sql = _LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def callsite(limit=3) -> str:
+    """Ближайшие кадры кода проекта, от места запроса к представлению."""
+    frames = []
+    frame = sys._getframe(1)
+    base = str(settings.BASE_DIR)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base)
+            and "site-packages" not in filename
+            and filename not in _SKIP_FILES
+        ):
+            frames.append(
+                f"{os.path.relpath(filename, base)}:{frame.f_lineno} "
+                f"in {frame.f_code.co_name}"
+            )
+        frame = frame.f_back
+    return " ← ".join(frames)
+
+
+def explain(connection, sql, params) -> str:
+    if connection.vendor == "sqlite":
+        statement = "EXPLAIN QUERY PLAN " + sql
+    else:
+        statement = "EXPLAIN " + sql
+    with connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        rows = cursor.fetchall()
+    if connection.vendor == "sqlite":
+        # (id, parent, notused, detail): отступ по глубине узла.
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return "\n".join(lines)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def record(connection, sql, params, elapsed_ms, site="") -> None:
+    from .models import SlowQuery
+
+    normalized = normalize(sql)
+    key = fingerprint(normalized)
+    with transaction.atomic(using=connection.alias):
+        updated = SlowQuery.objects.using(connection.alias).filter(
+            fingerprint=key
+        ).update(
+            calls=F("calls") + 1,
+            total_ms=F("total_ms") + elapsed_ms,
+            max_ms=Greatest("max_ms", elapsed_ms),
+            last_seen=timezone.now(),
+        )
+        if updated:
+            return
+        plan = ""
+        if key not in _seen and normalized.upper().startswith("SELECT"):
+            plan = explain(connection, sql, params)
+        SlowQuery.objects.using(connection.alias).get_or_create(
+            fingerprint=key,
+            defaults={
+                "sql": normalized,
+                "callsite": (site or callsite())[:500],
+                "plan": plan,
+                "total_ms": elapsed_ms,
+                "max_ms": elapsed_ms,
+            },
+        )
+    _seen.add(key)
+
+
+def _pending() -> list:
+    if not hasattr(_state, "pending"):
+        _state.pending = []
+    return _state.pending
+
+
+def flush(**kwargs) -> None:
+    """Пишет в журнал накопленные в этом потоке медленные запросы."""
+    pending, _state.pending = _pending(), []
+    _state.in_request = False
+    if not pending:
+        return
+    _state.busy = True
+    try:
+        for alias, sql, params, elapsed_ms, site in pending:
+            record(connections[alias], sql, params, elapsed_ms, site)
+    except DatabaseError:
+        # Например, таблица журнала ещё не создана миграцией.
+        logger.warning("Не удалось записать медленный запрос")
+    finally:
+        _state.busy = False
+
+
+def _start_request(**kwargs) -> None:
+    _state.pending = []
+    _state.in_request = True
+
+
+class SlowQueryWrapper:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, "busy", False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_MS and not many:
+            pending = _pending()
+            if len(pending) < MAX_PENDING:
+                site = callsite()
+                pending.append(
+                    (self.connection.alias, sql, params, elapsed_ms, site)
+                )
+            if not getattr(_state, "in_request", False) and (
+                not self.connection.in_atomic_block
+            ):
+                flush()
+        return result
+
+
+def _attach(sender, connection, **kwargs):
+    if not any(
+        isinstance(wrapper, SlowQueryWrapper)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(SlowQueryWrapper(connection))
+
+
+def install() -> None:
+    if settings.SLOW_QUERY_LOG:
+        connection_created.connect(_attach, dispatch_uid="core.slowlog")
+        request_started.connect(_start_request, dispatch_uid="core.slowlog")
+        request_finished.connect(flush, dispatch_uid="core.slowlog")
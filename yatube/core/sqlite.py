@@ -0,0 +1,37 @@
+"""
+Настройка соединений с SQLite.
+
+install() подписывается на connection_created и выполняет на каждом
+новом соединении PRAGMA из настройки SQLITE_PRAGMAS (WAL, synchronous,
+mmap_size, cache_size, temp_store). Режим WAL хранится в самом файле
+базы, остальные PRAGMA действуют только на соединение. busy_timeout
+задаёт OPTIONS["timeout"] в DATABASES; повтор транзакций, которым он
+не помогает, — core.decorators.retry_when_locked.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def pragmas(connection) -> dict:
+    """Текущие значения PRAGMA из SQLITE_PRAGMAS."""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}")
+            # Для базы в памяти mmap_size ничего не возвращает.
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def _configure(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # Мимо connection.cursor(): обёртки замеров здесь не нужны.
+    raw = connection.connection
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        raw.execute(f"PRAGMA {name} = {value}").fetchall()
+
+
+def install() -> None:
+    connection_created.connect(_configure, dispatch_uid="core.sqlite")
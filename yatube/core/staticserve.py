@@ -0,0 +1,120 @@
+"""
+Раздача статики и загруженных файлов прямо из процесса.
+
+StaticFilesMiddleware ставится первым (профиль prod) и отвечает на
+GET/HEAD к STATIC_URL и MEDIA_URL, не запуская сессии, аутентификацию и
+представления. Если клиент принимает сжатие и рядом с файлом лежит
+копия .br или .gz (core.storage), отдаётся она. Файлы с хешем
+содержимого в имени кэшируются навсегда (immutable), остальные — на
+STATIC_MAX_AGE или MEDIA_MAX_AGE секунд. Тело отдаёт FileResponse: если
+WSGI-сервер поддерживает wsgi.file_wrapper (gunicorn, uWSGI), файл
+уходит через sendfile без копирования в процесс.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import compression
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Хеш, который ManifestStaticFilesStorage вставляет перед расширением.
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+
+def cache_control(name: str, max_age: int) -> str:
+    if HASHED_NAME.search(name):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={max_age}"
+
+
+def find(root: str, name: str):
+    """Путь к файлу name внутри root или None."""
+    try:
+        path = safe_join(root, name)
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def serve(request, root: str, name: str, max_age: int):
+    """Ответ с файлом name из root; None, если такого файла нет."""
+    path = find(root, name)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control(name, max_age),
+    }
+    variants = [
+        (suffix, coding)
+        for suffix, coding in ENCODINGS
+        if os.path.isfile(path + suffix)
+    ]
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+    accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    body, coding = path, None
+    for suffix, candidate in variants:
+        if compression.accepts(accept, candidate):
+            body, coding = path + suffix, candidate
+            break
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = os.path.getsize(body)
+    else:
+        response = FileResponse(open(body, "rb"), content_type=content_type)
+        # FileResponse угадывает тип по имени: у x.html.gz это gzip.
+        response["Content-Type"] = content_type
+    if coding is not None:
+        response["Content-Encoding"] = coding
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+class StaticFilesMiddleware:
+    """Статика и медиа из STATIC_ROOT и MEDIA_ROOT (см. модуль)."""
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        static = settings.STATIC_URL, settings.STATIC_ROOT
+        media = settings.MEDIA_URL, settings.MEDIA_ROOT
+        self.roots = [
+            (prefix, root, max_age)
+            for (prefix, root), max_age in (
+                (static, settings.STATIC_MAX_AGE),
+                (media, settings.MEDIA_MAX_AGE),
+            )
+            if prefix and root and prefix.startswith("/")
+        ]
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD"):
+            for prefix, root, max_age in self.roots:
+                if request.path_info.startswith(prefix):
+                    name = request.path_info[len(prefix):]
+                    response = serve(request, root, name, max_age)
+                    if response is not None:
+                        return response
+        return self.get_response(request)
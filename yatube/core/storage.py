@@ -0,0 +1,42 @@
+"""
+Хранилище статики: имена с хешем содержимого и сжатые копии.
+
+ManifestStaticFilesStorage при collectstatic копирует файлы под именами
+вида style.3f2a1b9c0d4e.css и переписывает ссылки на них в CSS.
+CompressedManifestStaticFilesStorage вслед за этим кладёт рядом с
+каждым сжимаемым файлом (и с исходным именем, и с хешем) копии .gz и,
+если установлен brotli, .br; core.staticserve отдаёт их клиентам,
+которые принимают сжатие.
+"""
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from . import compression
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            yield name, hashed_name, processed
+            if isinstance(processed, Exception):
+                continue
+            processed_names.add(name)
+            if hashed_name:
+                processed_names.add(hashed_name)
+        if dry_run:
+            return
+        for name in sorted(processed_names):
+            if name.lower().endswith(compression.COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name) -> None:
+        with self.open(name) as source:
+            data = source.read()
+        for suffix, compressed in compression.variants(data).items():
+            # save() не перезаписывает файлы, а подбирает новое имя.
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
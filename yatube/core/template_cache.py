@@ -0,0 +1,40 @@
+"""
+Предварительный разбор шаблонов.
+
+С кэширующим загрузчиком (TEMPLATE_CACHE) каждый шаблон разбирается при
+первом обращении к нему, то есть на первых запросах воркера. precompile()
+разбирает заранее все шаблоны каталогов DIRS (templates/ проекта); его
+вызывает yatube.wsgi при старте и команда precompile_templates, которая
+заодно проверяет шаблоны на синтаксические ошибки.
+"""
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+TEMPLATE_SUFFIXES = (".html", ".txt", ".xml")
+
+
+def template_names(engine) -> list:
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    names = set()
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(TEMPLATE_SUFFIXES):
+                    path = os.path.relpath(os.path.join(root, name), directory)
+                    names.add(path.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def precompile() -> tuple:
+    """Разбирает все шаблоны проекта; (число разобранных, {имя: ошибка})."""
+    engine = engines["django"].engine
+    parsed, errors = 0, {}
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            errors[name] = str(error)
+        else:
+            parsed += 1
+    return parsed, errors
@@ -0,0 +1,295 @@
+import gzip
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts.models import Post
+
+from . import (
+    checks,
+    compression,
+    middleware,
+    sqlite,
+    staticserve,
+    template_cache,
+)
+from .decorators import retry_when_locked
+from .metrics import REGISTRY
+from .models import SlowQuery
+from .slowlog import normalize
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        Post.objects.create(author=cls.staff, text="Текст поста")
+
+    def setUp(self):
+        cache.clear()
+        REGISTRY.reset()
+
+    def test_requests_are_measured(self):
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_sql_queries_bucket{view="posts:index"', text)
+        self.assertIn(
+            'yatube_template_duration_seconds_sum{view="posts:index"}', text
+        )
+        # Вторая отрисовка взяла карточку из кэша.
+        self.assertIn('yatube_cache_hits_total{view="posts:index"}', text)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_access(self):
+        url = reverse("metrics")
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        Post.objects.create(author=cls.author, text="Текст поста")
+
+    def test_slow_queries_are_logged_with_plan(self):
+        url = reverse("posts:profile", kwargs={"username": "author"})
+        with override_settings(SLOW_QUERY_MS=0):
+            self.client.get(url)
+            self.client.get(url)
+        query = SlowQuery.objects.filter(
+            sql__contains='FROM "posts_post"', callsite__contains="views.py"
+        ).first()
+        self.assertIsNotNone(query)
+        self.assertEqual(query.calls, 2)
+        self.assertNotIn("'author'", query.sql)
+        self.assertTrue(query.plan)
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("план:", out.getvalue())
+
+    def test_slow_queries_are_written_after_the_request(self):
+        """Журнал пишется по request_finished, даже после отката."""
+        with override_settings(SLOW_QUERY_MS=0):
+            request_started.send(sender=None)
+            try:
+                with transaction.atomic():
+                    list(Post.objects.filter(text="откат"))
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            self.assertFalse(SlowQuery.objects.exists())
+            request_finished.send(sender=None)
+        self.assertTrue(
+            SlowQuery.objects.filter(sql__contains="posts_post").exists()
+        )
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x''y' AND b IN (1, 2, 3)"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...)",
+        )
+
+
+class TemplateCacheTest(TestCase):
+    def test_precompile_templates(self):
+        out = StringIO()
+        call_command("precompile_templates", stdout=out)
+        self.assertIn("Разобрано шаблонов", out.getvalue())
+        names = template_cache.template_names(engines["django"].engine)
+        self.assertIn("posts/includes/post_list.html", names)
+
+
+class SqliteTest(TransactionTestCase):
+    def test_pragmas_are_applied(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("только SQLite")
+        connection.ensure_connection()
+        values = sqlite.pragmas(connection)
+        # NORMAL = 1, MEMORY = 2; журнал базы в памяти WAL не бывает.
+        self.assertEqual(values["synchronous"], 1)
+        self.assertEqual(values["temp_store"], 2)
+        self.assertEqual(values["cache_size"], -64 * 1024)
+
+    @override_settings(DB_LOCK_RETRIES=2, DB_LOCK_RETRY_DELAY=0)
+    def test_retry_when_locked(self):
+        calls = []
+
+        @retry_when_locked
+        def view(request, fail):
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= fail:
+                raise OperationalError("database is locked")
+            return HttpResponse()
+
+        self.assertEqual(view(None, fail=2).status_code, 200)
+        self.assertEqual(calls, [True, True, True])
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            view(None, fail=3)
+        self.assertEqual(len(calls), 3)
+
+
+class PerformanceChecksTest(SimpleTestCase):
+    def ids(self, *functions):
+        return {
+            warning.id
+            for function in functions
+            for warning in function(None)
+        }
+
+    @override_settings(
+        DEBUG=True,
+        STATICFILES_STORAGE=(
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+        ),
+        MIDDLEWARE=[],
+    )
+    def test_development_settings_are_reported(self):
+        self.assertEqual(
+            self.ids(checks.check_debug, checks.check_static_and_compression),
+            {"performance.W001", "performance.W006", "performance.W007"},
+        )
+
+    @override_settings(
+        DEBUG=False,
+        STATICFILES_STORAGE=(
+            "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+        ),
+        MIDDLEWARE=["core.middleware.CompressionMiddleware"],
+        SQLITE_PRAGMAS={"journal_mode": "wal"},
+    )
+    def test_production_settings_pass(self):
+        with self.settings(
+            DATABASES={
+                "default": {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "CONN_MAX_AGE": 60,
+                }
+            }
+        ):
+            self.assertEqual(
+                self.ids(
+                    checks.check_databases,
+                    checks.check_static_and_compression,
+                ),
+                set(),
+            )
+
+    def test_responses_are_compressed(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+        response = middleware.CompressionMiddleware(
+            lambda request: HttpResponse("Текст поста. " * 100)
+        )(request)
+        expected = "br" if compression.brotli is not None else "gzip"
+        self.assertEqual(response["Content-Encoding"], expected)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+
+class StaticFilesTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def get(self, path, **headers):
+        with self.settings(
+            STATIC_ROOT=self.root, STATIC_URL="/static/", STATIC_SERVE=True
+        ):
+            handler = staticserve.StaticFilesMiddleware(
+                lambda request: HttpResponse(status=HTTPStatus.NOT_FOUND)
+            )
+        return handler(RequestFactory().get(path, **headers))
+
+    def test_collectstatic_writes_compressed_copies(self):
+        with self.settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE=(
+                "core.storage.CompressedManifestStaticFilesStorage"
+            ),
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        names = os.listdir(os.path.join(self.root, "css"))
+        hashed = [
+            name for name in names
+            if staticserve.HASHED_NAME.search(name) and name.endswith(".css")
+        ]
+        self.assertTrue(hashed)
+        for name in hashed:
+            self.assertIn(name + ".gz", names)
+            with gzip.open(os.path.join(self.root, "css", name + ".gz")) as f:
+                compressed = f.read()
+            with open(os.path.join(self.root, "css", name), "rb") as f:
+                self.assertEqual(compressed, f.read())
+
+    def test_precompressed_file_is_served(self):
+        content = b"body { color: red; }" * 100
+        name = "site.0123456789ab.css"
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(content)
+        for suffix, data in compression.variants(content).items():
+            with open(os.path.join(self.root, name + suffix), "wb") as f:
+                f.write(data)
+
+        response = self.get(f"/static/{name}", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)), content
+        )
+
+        plain = self.get(f"/static/{name}")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(b"".join(plain.streaming_content), content)
+
+        cached = self.get(
+            f"/static/{name}", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_unhashed_and_missing_files(self):
+        with open(os.path.join(self.root, "robots.txt"), "w") as f:
+            f.write("User-agent: *")
+        with self.settings(STATIC_MAX_AGE=60):
+            response = self.get("/static/robots.txt")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        for path in ("/static/missing.css", "/static/../settings.py"):
+            with self.subTest(path=path):
+                self.assertEqual(
+                    self.get(path).status_code, HTTPStatus.NOT_FOUND
+                )
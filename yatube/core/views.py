@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -13,3 +19,21 @@ def server_error(request):
 
 def csrf_failure(request, reason=""):
     return render(request, "core/403csrf.html")
+
+
+def metrics(request):
+    """
+    Гистограммы запросов в формате Prometheus. Доступны персоналу или по
+    заголовку Authorization: Bearer <METRICS_TOKEN> для сборщика.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    allowed = request.user.is_staff or (
+        token and hmac.compare_digest(header, f"Bearer {token}")
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        request_metrics.REGISTRY.exposition(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
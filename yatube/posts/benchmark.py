@@ -0,0 +1,487 @@
+"""
+Нагрузочные замеры горячих страниц.
+
+seed() быстро заполняет базу синтетическими пользователями, группами,
+постами, комментариями и подписками (bulk_create пачками, без сигналов).
+run() обходит все адреса posts.urls тестовым клиентом Django (со всеми
+middleware) и для каждого считает число SQL-запросов и задержку
+p50/p95/p99, а с explain=True — ещё и планы SELECT-запросов, отмечая
+сортировку в памяти. compare() сверяет результат с сохранённым эталоном:
+рост числа запросов, сортировок или p95 сверх допуска — регрессия.
+render_times() сравнивает время отрисовки шаблонов страниц лент без
+кэширующего загрузчика шаблонов и с ним. concurrent() гоняет те же
+страницы в нескольких потоках, сначала только на чтение, затем вместе с
+потоками, которые пишут комментарии, и показывает, как меняется
+пропускная способность чтения.
+"""
+import copy
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import metrics, slowlog, template_cache
+
+from . import counters, feed, stored_images, urls
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+PREFIX = "bench"
+BATCH_SIZE = 5000
+WORDS = (
+    "лето осень зима весна город море лес река дом улица книга кошка "
+    "собака утро вечер дорога поезд музыка письмо окно"
+).split()
+
+# Эти представления меняют данные даже на GET или отдают всю базу.
+SKIP_VIEWS = {"profile_follow", "profile_unfollow", "export"}
+QUERY_STRINGS = {"search": "?q=" + WORDS[0]}
+# Страницы, которые отрисовывают ленты постов или комментариев.
+LISTING_VIEWS = (
+    "index", "group_list", "profile", "post_detail", "follow_index"
+)
+TEMPLATE_METRIC = "yatube_template_duration_seconds"
+# Строки плана, означающие сортировку в памяти (SQLite, PostgreSQL).
+SORT_MARKERS = ("USE TEMP B-TREE FOR ORDER BY", "Sort ")
+
+
+def _insert(model, objs, batch_size) -> int:
+    objs = iter(objs)
+    total = 0
+    batch = list(islice(objs, batch_size))
+    while batch:
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+        batch = list(islice(objs, batch_size))
+    return total
+
+
+def _text(rng, words=12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def clear() -> None:
+    """Удаляет синтетические данные предыдущего seed()."""
+    User.objects.filter(username__startswith=f"{PREFIX}_").delete()
+    Group.objects.filter(slug__startswith=f"{PREFIX}-").delete()
+
+
+def seed(
+    users=100_000,
+    posts=1_000_000,
+    follows=10_000_000,
+    groups=50,
+    comments=0,
+    days=365,
+    batch_size=BATCH_SIZE,
+    random_seed=0,
+    log=None,
+) -> dict:
+    """Создаёт синтетический набор данных; возвращает число строк."""
+    rng = random.Random(random_seed)
+    log = log or (lambda message: None)
+    started = time.monotonic()
+    # Хеш пароля считается долго: один неиспользуемый на всех.
+    password = make_password(None)
+    created = {}
+    created["users"] = _insert(
+        User,
+        (
+            User(username=f"{PREFIX}_{n}", password=password)
+            for n in range(users)
+        ),
+        batch_size,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith=f"{PREFIX}_").values_list(
+            "pk", flat=True
+        )
+    )
+    log(f"users: {len(user_ids)} ({time.monotonic() - started:.1f} с)")
+    created["groups"] = _insert(
+        Group,
+        (
+            Group(
+                slug=f"{PREFIX}-{n}",
+                title=f"Группа {n}",
+                description=_text(rng),
+            )
+            for n in range(groups)
+        ),
+        batch_size,
+    )
+    group_ids = list(
+        Group.objects.filter(slug__startswith=f"{PREFIX}-").values_list(
+            "pk", flat=True
+        )
+    ) + [None]
+    now = timezone.now()
+    span = int(timedelta(days=days).total_seconds())
+
+    def moment():
+        return now - timedelta(seconds=rng.randrange(span))
+
+    created["posts"] = _insert(
+        Post,
+        (
+            Post(
+                author_id=rng.choice(user_ids),
+                group_id=rng.choice(group_ids),
+                text=_text(rng, rng.randint(5, 60)),
+                created=moment(),
+            )
+            for _ in range(posts)
+        ),
+        batch_size,
+    )
+    log(f"posts: {created['posts']} ({time.monotonic() - started:.1f} с)")
+    if comments:
+        post_ids = list(
+            Post.objects.filter(
+                author__username__startswith=f"{PREFIX}_"
+            ).values_list("pk", flat=True)
+        )
+        created["comments"] = _insert(
+            Comment,
+            (
+                Comment(
+                    post_id=rng.choice(post_ids),
+                    author_id=rng.choice(user_ids),
+                    text=_text(rng),
+                    created=moment(),
+                )
+                for _ in range(comments)
+            ),
+            batch_size,
+        )
+    per_user = min(follows // max(len(user_ids), 1), len(user_ids) - 1)
+
+    def authors(user_id):
+        # Лишний кандидат на случай, если в выборку попадёт сам подписчик.
+        candidates = rng.sample(user_ids, per_user + 1)
+        return [pk for pk in candidates if pk != user_id][:per_user]
+
+    created["follows"] = _insert(
+        Follow,
+        (
+            Follow(user_id=user_id, author_id=author_id, created=moment())
+            for user_id in user_ids
+            for author_id in authors(user_id)
+        ),
+        batch_size,
+    )
+    log(f"follows: {created['follows']} ({time.monotonic() - started:.1f} с)")
+    counters.reconcile()
+    stored_images.recount()
+    if feed.is_materialized():
+        feed.rebuild()
+    return created
+
+
+def _host() -> str:
+    return next(
+        (
+            host
+            for host in settings.ALLOWED_HOSTS
+            if "*" not in host and not host.startswith(".")
+        ),
+        "localhost",
+    )
+
+
+def targets():
+    """
+    Адреса posts.urls с подставленными параметрами: самый активный
+    автор, подписчик с наибольшим числом подписок, его пост и группа.
+    """
+    author = (
+        Post.objects.values_list("author__username")
+        .annotate(total=Count("pk"))
+        .order_by("-total")
+        .first()
+    )
+    follower = (
+        Follow.objects.values_list("user_id")
+        .annotate(total=Count("pk"))
+        .order_by("-total")
+        .first()
+    )
+    post = Post.objects.values_list("pk", flat=True).first()
+    group = (
+        Group.objects.exclude(slug=None).values_list("slug", flat=True).first()
+    )
+    values = {
+        "username": author and author[0],
+        "post_id": post,
+        "slug": group,
+    }
+    found = []
+    for pattern in urls.urlpatterns:
+        if pattern.name in SKIP_VIEWS:
+            continue
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        if None in kwargs.values():
+            continue
+        url = reverse(f"{urls.app_name}:{pattern.name}", kwargs=kwargs)
+        url += QUERY_STRINGS.get(pattern.name, "")
+        found.append((pattern.name, url))
+    user = User.objects.filter(pk=follower[0]).first() if follower else None
+    return found, user
+
+
+def percentile(values, share) -> float:
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def measure(client, url, iterations, warmup=1, cold=False) -> dict:
+    view = None
+    for _ in range(warmup):
+        match = client.get(url).resolver_match
+        view = match.view_name if match else None
+    # Время шаблонов считает core.metrics, если замеры включены.
+    render_before = metrics.REGISTRY.total(TEMPLATE_METRIC, view)
+    timings = []
+    status = queries = None
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        queries = len(captured)
+    render_sum, render_count = metrics.REGISTRY.total(TEMPLATE_METRIC, view)
+    render = None
+    if view is not None and render_count > render_before[1]:
+        render = round(
+            (render_sum - render_before[0])
+            * 1000
+            / (render_count - render_before[1]),
+            2,
+        )
+    return {
+        "url": url,
+        "status": status,
+        "queries": queries,
+        "p50": round(percentile(timings, 0.50), 2),
+        "p95": round(percentile(timings, 0.95), 2),
+        "p99": round(percentile(timings, 0.99), 2),
+        "render": render,
+    }
+
+
+def sorted_queries(client, url) -> list:
+    """SELECT-запросы страницы, план которых сортирует строки в памяти."""
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        client.get(url)
+    found = []
+    for sql, params in captured:
+        if not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        plan = slowlog.explain(connection, sql, params)
+        if any(marker in plan for marker in SORT_MARKERS):
+            found.append({"sql": sql, "plan": plan})
+    return found
+
+
+def _client(user=None) -> Client:
+    # Адрес не из INTERNAL_IPS: иначе при DEBUG замер включит debug_toolbar.
+    client = Client(SERVER_NAME=_host(), REMOTE_ADDR="192.0.2.1")
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def run(
+    iterations=20, anonymous=False, cold=False, only=None, explain=False
+) -> dict:
+    """Замеры всех адресов; ключ результата — имя представления."""
+    found, user = targets()
+    client = _client(None if anonymous else user)
+    results = {}
+    for name, url in found:
+        if only and name not in only:
+            continue
+        results[name] = measure(client, url, iterations, cold=cold)
+        if explain:
+            sorted_found = sorted_queries(client, url)
+            results[name]["sorts"] = len(sorted_found)
+            results[name]["sorted"] = sorted_found
+    return results
+
+
+def _templates(cached) -> list:
+    """TEMPLATES с кэширующим загрузчиком или без него."""
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [("django.template.loaders.cached.Loader", loaders)]
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        engine["APP_DIRS"] = False
+        engine["OPTIONS"]["loaders"] = loaders
+    return templates
+
+
+def render_times(iterations=20, anonymous=False) -> dict:
+    """
+    Среднее время отрисовки шаблонов (мс) страниц лент: "plain" — шаблоны
+    разбираются на каждом запросе, "cached" — кэширующий загрузчик после
+    precompile(). Кэш очищается перед каждым запросом, чтобы карточки
+    постов отрисовывались заново.
+    """
+    results = {}
+    for mode, cached in (("plain", False), ("cached", True)):
+        with override_settings(TEMPLATES=_templates(cached)):
+            if cached:
+                template_cache.precompile()
+            measured = run(
+                iterations, anonymous=anonymous, cold=True, only=LISTING_VIEWS
+            )
+        for name, result in measured.items():
+            row = results.setdefault(name, {"url": result["url"]})
+            row[mode] = result["render"]
+    return results
+
+
+def _loop(client, requests, deadline, stats) -> None:
+    """Запросы по кругу до deadline; в stats — (задержки, ошибки)."""
+    timings, errors = [], 0
+    try:
+        for method, url, data in itertools.cycle(requests):
+            started = time.perf_counter()
+            if started >= deadline:
+                break
+            try:
+                response = getattr(client, method)(url, data)
+                failed = response.status_code >= 400
+            except DatabaseError:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        # Соединение потока иначе останется открытым.
+        connection.close()
+    stats.append((timings, errors))
+
+
+def _phase(readers, writers, reads, writes, duration) -> dict:
+    deadline = time.perf_counter() + duration
+    read_stats, write_stats = [], []
+    threads = [
+        threading.Thread(
+            target=_loop, args=(client, requests, deadline, stats)
+        )
+        for clients, requests, stats in (
+            (readers, reads, read_stats),
+            (writers, writes, write_stats),
+        )
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    read_timings = [t for timings, _ in read_stats for t in timings]
+    write_count = sum(len(timings) for timings, _ in write_stats)
+    read_p95 = None
+    if read_timings:
+        read_p95 = round(percentile(read_timings, 0.95), 2)
+    return {
+        "reads_per_s": round(len(read_timings) / duration, 1),
+        "read_p95": read_p95,
+        "writes_per_s": round(write_count / duration, 1),
+        "errors": sum(errors for _, errors in read_stats + write_stats),
+    }
+
+
+def concurrent(readers=4, writers=1, duration=5.0, anonymous=False) -> dict:
+    """
+    Пропускная способность чтения в потоках: сначала без записи, затем
+    вместе с writers потоками, которые добавляют комментарии.
+    """
+    found, user = targets()
+    found = dict(found)
+    write_url = found.pop("add_comment", None)
+    reads = [("get", url, None) for url in found.values()]
+    writes = [("post", write_url, {"text": _text(random.Random())})]
+    # Клиенты готовим заранее: вход пишет сессию в базу.
+    read_clients = [
+        _client(None if anonymous else user) for _ in range(readers)
+    ]
+    write_clients = []
+    if write_url is not None and user is not None:
+        write_clients = [_client(user) for _ in range(writers)]
+    return {
+        "read-only": _phase(read_clients, [], reads, writes, duration),
+        "mixed": _phase(read_clients, write_clients, reads, writes, duration),
+    }
+
+
+def compare(results, baseline, tolerance=0.25, slack_ms=2.0) -> list:
+    """Регрессии относительно эталона: список описаний."""
+    problems = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["queries"] > base["queries"]:
+            problems.append(
+                f"{name}: запросов {current['queries']} "
+                f"вместо {base['queries']}"
+            )
+        # Сортировки сравниваем, только если оба замера сняты с --explain.
+        if current.get("sorts", 0) > base.get("sorts", float("inf")):
+            problems.append(
+                f"{name}: сортировок в памяти {current['sorts']} "
+                f"вместо {base['sorts']}"
+            )
+        limit = base["p95"] * (1 + tolerance) + slack_ms
+        if current["p95"] > limit:
+            problems.append(
+                f"{name}: p95 {current['p95']} мс, допустимо до {limit:.2f} мс"
+            )
+    return problems
+
+
+def load_baseline(path) -> dict:
+    with open(path, encoding="utf-8") as source:
+        return json.load(source)
+
+
+def save_baseline(path, results) -> None:
+    # Планы в эталон не пишем: сравнивается только число сортировок.
+    results = {
+        name: {key: value for key, value in result.items() if key != "sorted"}
+        for name, result in results.items()
+    }
+    with open(path, "w", encoding="utf-8") as target:
+        json.dump(results, target, ensure_ascii=False, indent=2)
+        target.write("\n")
@@ -0,0 +1,163 @@
+"""
+Кэш карточек постов.
+
+Карточка (posts/includes/post_list.html) кэшируется отдельно для каждого
+поста вместе с его версией: версиями самого поста, автора и группы.
+Версии хранятся в кэше под своими ключами и меняются сигналами при
+сохранении и удалении поста, переименовании автора и правке группы,
+поэтому изменение видно сразу и не требует обходить карточки всех постов
+автора или группы. Внутри транзакции версии меняются ещё раз после её
+фиксации. Версии и карточки страницы читаются одним get_many.
+
+Недостающие карточки страницы отрисовываются одним проходом шаблона
+posts/includes/post_cards.html: вложенные шаблоны карточки загружаются
+один раз на страницу, а не на каждый пост; результат режется по
+разделителю на отдельные карточки.
+
+Общая версия лент (listing_stamp) меняется при любой правке поста; по ней
+API проверяет, не устарели ли ранее отданные страницы. Время её смены
+(listing_changed) входит в Last-Modified страниц (core.decorators).
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARDS_TEMPLATE = "posts/includes/post_cards.html"
+LISTING_STAMP_KEY = "posts:listing-stamp"
+LISTING_CHANGED_KEY = "posts:listing-changed"
+
+
+def stamp_key(post_id: int) -> str:
+    return f"posts:card-stamp:{post_id}"
+
+
+def card_key(post_id: int) -> str:
+    return f"posts:card:{post_id}"
+
+
+def author_stamp_key(author_id: int) -> str:
+    return f"posts:author-stamp:{author_id}"
+
+
+def group_stamp_key(group_id: int) -> str:
+    return f"posts:group-stamp:{group_id}"
+
+
+def _set_stamps(keys) -> None:
+    stamp = uuid.uuid4().hex
+    values = dict.fromkeys(keys, stamp)
+    values[LISTING_CHANGED_KEY] = time.time()
+    cache.set_many(values, None)
+
+
+def _bump(*keys: str) -> None:
+    _set_stamps(keys)
+    if connection.in_atomic_block:
+        # Пока транзакция не зафиксирована, читатель видит прежнюю строку
+        # и может закэшировать её карточку под новой версией: после
+        # фиксации версии меняются ещё раз.
+        transaction.on_commit(lambda: _set_stamps(keys))
+
+
+def bump(post_id: int) -> None:
+    """Объявляет закэшированную карточку поста устаревшей."""
+    _bump(stamp_key(post_id), LISTING_STAMP_KEY)
+
+
+def bump_author(author_id: int) -> None:
+    """Объявляет устаревшими карточки всех постов автора."""
+    _bump(author_stamp_key(author_id), LISTING_STAMP_KEY)
+
+
+def bump_group(group_id: int) -> None:
+    """Объявляет устаревшими карточки всех постов группы."""
+    _bump(group_stamp_key(group_id), LISTING_STAMP_KEY)
+
+
+def bump_listings() -> None:
+    """Меняет общую версию лент, не трогая карточки."""
+    _bump(LISTING_STAMP_KEY)
+
+
+def listing_stamp() -> str:
+    stamp = cache.get(LISTING_STAMP_KEY)
+    if stamp is None:
+        cache.add(LISTING_STAMP_KEY, uuid.uuid4().hex, None)
+        stamp = cache.get(LISTING_STAMP_KEY, "")
+    return stamp
+
+
+def listing_changed() -> float:
+    """Время последней смены общей версии лент, секунды от эпохи."""
+    changed = cache.get(LISTING_CHANGED_KEY)
+    if changed is None:
+        # Версию потеряли вместе с кэшем: считаем, что ленты только что
+        # изменились.
+        cache.add(LISTING_CHANGED_KEY, time.time(), None)
+        changed = cache.get(LISTING_CHANGED_KEY) or time.time()
+    return changed
+
+
+def render_many(posts) -> list:
+    """HTML карточек постов, отрисованных за один проход шаблона."""
+    if not posts:
+        return []
+    separator = mark_safe(f"<!-- card {uuid.uuid4().hex} -->")
+    html = render_to_string(
+        CARDS_TEMPLATE, {"posts": posts, "separator": separator}
+    )
+    return html.split(separator)[:len(posts)]
+
+
+def _stamp_keys(post) -> list:
+    keys = [stamp_key(post.pk), author_stamp_key(post.author_id)]
+    if post.group_id:
+        keys.append(group_stamp_key(post.group_id))
+    return keys
+
+
+def _version(post, found: dict):
+    """Версия карточки; None, если какую-то из версий не удалось задать."""
+    parts = []
+    for key in _stamp_keys(post):
+        stamp = found.get(key)
+        if stamp is None:
+            # add() не перезапишет версию, если её успели сменить сигналом:
+            # тогда карточка с неизвестной версией не сохраняется.
+            stamp = uuid.uuid4().hex
+            if not cache.add(key, stamp, None):
+                return None
+            found[key] = stamp
+        parts.append(stamp)
+    return ":".join(parts)
+
+
+def render_cards(posts) -> list:
+    """HTML карточек в порядке постов: из кэша или отрисованные заново."""
+    posts = list(posts)
+    keys = {key for post in posts for key in _stamp_keys(post)}
+    keys.update(card_key(post.pk) for post in posts)
+    found = cache.get_many(keys)
+    cards, versions, missing, fresh = {}, {}, [], {}
+    for post in posts:
+        version = _version(post, found)
+        cached = found.get(card_key(post.pk))
+        if version is not None and cached is not None and (
+            cached[0] == version
+        ):
+            cards[post.pk] = cached[1]
+            continue
+        versions[post.pk] = version
+        missing.append(post)
+    for post, html in zip(missing, render_many(missing)):
+        cards[post.pk] = html
+        if versions[post.pk] is not None:
+            fresh[card_key(post.pk)] = (versions[post.pk], html)
+    if fresh:
+        cache.set_many(fresh, settings.POST_CARD_CACHE_TIMEOUT)
+    return [cards[post.pk] for post in posts]
@@ -0,0 +1,109 @@
+"""
+Счётчики постов и комментариев.
+
+Значения хранятся в таблице posts.Counter и меняются сигналами
+(posts.signals). Строка счётчика создаётся при первом чтении одним
+COUNT(*); дальше чтение — выборка по уникальному ключу. Массовые
+операции (bulk_create, QuerySet.update/delete) сигналов не шлют, поэтому
+значения приблизительные и периодически сверяются командой
+reconcile_counters.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Comment, Counter, Post
+
+TOTAL_KEY = "posts:all"
+
+
+def author_key(author_id: int) -> str:
+    return f"posts:author:{author_id}"
+
+
+def group_key(group_id: int) -> str:
+    return f"posts:group:{group_id}"
+
+
+def comments_key(post_id: int) -> str:
+    return f"comments:post:{post_id}"
+
+
+def get_count(key: str, queryset) -> int:
+    """Значение счётчика; при первом обращении считается по выборке."""
+    value = (
+        Counter.objects.filter(key=key).values_list("value", flat=True).first()
+    )
+    if value is None:
+        value = queryset.count()
+        Counter.objects.get_or_create(key=key, defaults={"value": value})
+    return value
+
+
+def post_count(author_id=None, group_id=None) -> int:
+    if author_id is not None:
+        return get_count(
+            author_key(author_id), Post.objects.filter(author_id=author_id)
+        )
+    if group_id is not None:
+        return get_count(
+            group_key(group_id), Post.objects.filter(group_id=group_id)
+        )
+    return get_count(TOTAL_KEY, Post.objects.all())
+
+
+def comment_count(post_id: int) -> int:
+    return get_count(
+        comments_key(post_id), Comment.objects.filter(post_id=post_id)
+    )
+
+
+def change(*keys, delta: int = 1) -> None:
+    """
+    Сдвигает существующие счётчики. Несозданные не трогаем: их посчитает
+    первое чтение.
+    """
+    keys = [key for key in keys if key is not None]
+    if keys:
+        Counter.objects.filter(key__in=keys).update(value=F("value") + delta)
+
+
+def expected_counts() -> dict:
+    """Точные значения всех счётчиков по данным таблиц."""
+    expected = {TOTAL_KEY: Post.objects.count()}
+    groups = (
+        Post.objects.exclude(group=None)
+        .values_list("group_id")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    authors = (
+        Post.objects.values_list("author_id")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    comments = (
+        Comment.objects.values_list("post_id")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    expected.update((group_key(pk), total) for pk, total in groups)
+    expected.update((author_key(pk), total) for pk, total in authors)
+    expected.update((comments_key(pk), total) for pk, total in comments)
+    return expected
+
+
+@transaction.atomic
+def reconcile() -> int:
+    """Сверяет счётчики с таблицами; возвращает число исправленных."""
+    expected = expected_counts()
+    stored = dict(Counter.objects.values_list("key", "value"))
+    fixed = 0
+    for key, value in stored.items():
+        actual = expected.pop(key, 0)
+        if value != actual:
+            Counter.objects.filter(key=key).update(value=actual)
+            fixed += 1
+    Counter.objects.bulk_create(
+        Counter(key=key, value=value) for key, value in expected.items()
+    )
+    return fixed + len(expected)
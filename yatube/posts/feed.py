@@ -0,0 +1,168 @@
+"""
+Выборки постов для лент.
+
+Все ленты собираются через card_queryset(): она подтягивает автора и
+группу одним запросом и читает только поля, нужные карточке поста.
+Лента подписок строится соединением Follow и Post или читается из
+материализованной ленты (FOLLOW_FEED_MODE).
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Comment, FeedItem, Follow, Post
+
+FEED_MODE_JOIN = "join"
+FEED_MODE_MATERIALIZED = "materialized"
+
+BATCH_SIZE = 1000
+
+# Поля, которые выводит карточка поста в лентах.
+CARD_FIELDS = (
+    "text",
+    "created",
+    "image",
+    "thumbnail_url",
+    "thumbnail_width",
+    "thumbnail_height",
+    "image_variants",
+    "author",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+    "group",
+    "group__title",
+    "group__slug",
+)
+
+# Поля, которые выводит комментарий под постом.
+COMMENT_FIELDS = (
+    "post",
+    "text",
+    "created",
+    "author",
+    "author__username",
+)
+COMMENT_ORDERING = ("-created", "-pk")
+
+
+def is_materialized() -> bool:
+    return settings.FOLLOW_FEED_MODE == FEED_MODE_MATERIALIZED
+
+
+def card_queryset(queryset=None):
+    """Выборка постов для карточек ленты: JOIN автора и группы, only()."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    queryset = queryset.select_related("author", "group").only(*CARD_FIELDS)
+    if not queryset.query.order_by:
+        queryset = queryset.order_by(*Post._meta.ordering)
+    return queryset
+
+
+def index_posts():
+    """Все посты сайта."""
+    return card_queryset()
+
+
+def group_posts(group):
+    """Посты группы."""
+    return card_queryset(Post.objects.filter(group=group))
+
+
+def author_posts(author):
+    """Посты автора."""
+    return card_queryset(Post.objects.filter(author=author))
+
+
+def follow_posts(user):
+    """Посты авторов, на которых подписан пользователь."""
+    return card_queryset(_follow_queryset(user))
+
+
+def post_comments(post_id: int):
+    """Комментарии поста вместе с авторами, новые сверху."""
+    return (
+        Comment.objects.filter(post_id=post_id)
+        .select_related("author")
+        .only(*COMMENT_FIELDS)
+        .order_by(*COMMENT_ORDERING)
+    )
+
+
+def _follow_queryset(user):
+    if is_materialized():
+        # Ключ сортировки вынесен в аннотации, чтобы курсорный паджинатор
+        # мог прочитать его у постов.
+        return (
+            Post.objects.filter(feed_items__user=user)
+            .annotate(
+                feed_created=F("feed_items__created"),
+                feed_post=F("feed_items__post"),
+            )
+            .order_by("-feed_created", "-feed_post")
+        )
+    return Post.objects.filter(author__following__user=user)
+
+
+def _bulk_add(items) -> None:
+    # bulk_create сам превращает итератор в список, поэтому режем на пачки,
+    # чтобы у автора с миллионом подписчиков не держать всё в памяти.
+    items = iter(items)
+    batch = list(islice(items, BATCH_SIZE))
+    while batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(items, BATCH_SIZE))
+
+
+def _copy_posts(user_id: int, author_id: int) -> None:
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "created"
+    )
+    _bulk_add(
+        FeedItem(user_id=user_id, post_id=post_id, created=created)
+        for post_id, created in posts.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def fan_out(post: Post) -> None:
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_materialized():
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_add(
+        FeedItem(user_id=user_id, post=post, created=post.created)
+        for user_id in followers.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def backfill(user, author) -> None:
+    """Добавляет в ленту пользователя уже написанные посты автора."""
+    if not is_materialized():
+        return
+    _copy_posts(user.pk, author.pk)
+
+
+def prune(user, author) -> None:
+    """Убирает из ленты пользователя посты автора после отписки."""
+    if not is_materialized():
+        return
+    FeedItem.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user=None) -> int:
+    """Перестраивает ленты с нуля; возвращает число записей."""
+    follows = Follow.objects.values_list("user_id", "author_id")
+    items = FeedItem.objects.all()
+    if user is not None:
+        follows = follows.filter(user=user)
+        items = items.filter(user=user)
+    with transaction.atomic():
+        items.delete()
+        for user_id, author_id in follows.iterator(chunk_size=BATCH_SIZE):
+            _copy_posts(user_id, author_id)
+    return items.count()
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import export, thumbnails, uploads
 from .models import Comment, Post
 
 
@@ -12,6 +13,21 @@ class PostForm(forms.ModelForm):
             "image",
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_error = None
+        name = self.add_prefix("image")
+        upload = self.files.get(name)
+        if upload is not None:
+            try:
+                uploads.check(upload)
+            except forms.ValidationError as error:
+                # ImageField не должен открывать картинку, которая не
+                # прошла проверку: ошибку добавит clean().
+                self.image_error = error
+                self.files = self.files.copy()
+                self.files.pop(name)
+
     def clean_text(self):
         data = self.cleaned_data["text"]
         if not data:
@@ -19,8 +35,52 @@ class PostForm(forms.ModelForm):
 
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        if image and "image" in self.changed_data:
+            return uploads.reencode(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_error is not None:
+            self.add_error("image", self.image_error)
+        return cleaned_data
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        if "image" in self.changed_data:
+            thumbnails.reset(post)
+        if commit:
+            post.save()
+        return post
+
+    def schedule_thumbnail(self, post) -> None:
+        """Запускает фоновую подготовку миниатюры новой картинки."""
+        if "image" in self.changed_data:
+            thumbnails.schedule(post)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ("text",)
+
+
+class ExportForm(forms.Form):
+    """Параметры выгрузки (posts:export)."""
+
+    format = forms.ChoiceField(
+        choices=[(fmt, fmt) for fmt in export.FORMATS],
+        required=False,
+    )
+    tables = forms.MultipleChoiceField(
+        choices=[(name, name) for name in export.TABLES],
+        required=False,
+    )
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    author = forms.CharField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or export.NDJSON
@@ -0,0 +1,145 @@
+"""
+Варианты картинок постов для адаптивной вёрстки.
+
+Для каждой картинки готовятся копии нескольких ширин (POST_IMAGE_WIDTHS)
+с кадрированием как у миниатюры ленты и в нескольких форматах: AVIF и
+WebP, если их умеет сохранять установленный Pillow, и JPEG как запасной.
+Файлы лежат в posts/variants/<имя картинки>/<версия>/, где версия — хеш
+содержимого картинки и параметров вариантов; список вариантов хранится
+в Post.image_variants.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = "posts/variants"
+# Пропорции совпадают с миниатюрой ленты 960x339.
+ASPECT = 339 / 960
+
+# (расширение, формат Pillow, MIME-тип) — от самого компактного.
+FORMATS = (
+    ("avif", "AVIF", "image/avif"),
+    ("webp", "WEBP", "image/webp"),
+    ("jpg", "JPEG", "image/jpeg"),
+)
+QUALITY = 80
+
+
+def available_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[1] in Image.SAVE]
+
+
+def _widths(source_width: int):
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    # Больше исходной ширины не растягиваем; самая узкая копия нужна всегда.
+    return [w for w in widths if w <= source_width] or widths[:1]
+
+
+def _variants_dir(image_name: str) -> str:
+    return f"{VARIANTS_DIR}/{image_name}"
+
+
+def _token(data: bytes) -> str:
+    # Меняется вместе с содержимым картинки и параметрами вариантов:
+    # новые варианты получают новые адреса, кэш браузеров не мешает.
+    digest = hashlib.sha256(data)
+    digest.update(f"{QUALITY}:{ASPECT}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _variant_name(image_name: str, token: str, width: int, ext: str) -> str:
+    return f"{_variants_dir(image_name)}/{token}/{width}.{ext}"
+
+
+def build_variants(image) -> list:
+    """Сохраняет варианты картинки и возвращает их описание."""
+    image.open("rb")
+    try:
+        data = image.read()
+    finally:
+        image.close()
+    token = _token(data)
+    source = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    source.load()
+    # Варианты прежнего содержимого файла с тем же именем больше не нужны.
+    delete_variants(image.name, keep=token)
+    variants = []
+    for width in _widths(source.width):
+        size = (width, round(width * ASPECT))
+        resized = ImageOps.fit(source, size, Image.LANCZOS)
+        for ext, pil_format, mime in available_formats():
+            frame = resized
+            if pil_format == "JPEG" or frame.mode not in ("RGB", "RGBA"):
+                frame = frame.convert("RGB")
+            buffer = BytesIO()
+            frame.save(buffer, pil_format, quality=QUALITY)
+            name = _variant_name(image.name, token, width, ext)
+            default_storage.delete(name)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.append(
+                {
+                    "type": mime,
+                    "width": size[0],
+                    "height": size[1],
+                    "url": default_storage.url(name),
+                }
+            )
+    return variants
+
+
+def _delete_tree(directory: str, keep=None) -> int:
+    subdirs, files = default_storage.listdir(directory)
+    freed = 0
+    for filename in files:
+        name = f"{directory}/{filename}"
+        freed += default_storage.size(name)
+        default_storage.delete(name)
+    for subdir in subdirs:
+        if subdir != keep:
+            freed += _delete_tree(f"{directory}/{subdir}")
+    return freed
+
+
+def delete_variants(image_name: str, keep=None) -> int:
+    """
+    Удаляет варианты картинки, кроме версии keep; возвращает их общий
+    размер.
+    """
+    directory = _variants_dir(image_name)
+    if not default_storage.exists(directory):
+        return 0
+    return _delete_tree(directory, keep)
+
+
+def dumps(variants) -> str:
+    return json.dumps(variants, separators=(",", ":"))
+
+
+def sources(post) -> list:
+    """Группы вариантов по формату: [{"type", "srcset", "width"}, ...]."""
+    try:
+        variants = json.loads(post.image_variants or "[]")
+    except ValueError:
+        # Испорченный список вариантов: выводим картинку без них.
+        return []
+    grouped = {}
+    for variant in variants:
+        grouped.setdefault(variant["type"], []).append(variant)
+    return [
+        {
+            "type": mime,
+            "srcset": ", ".join(
+                f"{item['url']} {item['width']}w" for item in items
+            ),
+            "src": items[-1]["url"],
+            "width": items[-1]["width"],
+            "height": items[-1]["height"],
+        }
+        for mime, items in grouped.items()
+    ]
@@ -0,0 +1,243 @@
+"""
+Массовая загрузка групп, постов, комментариев и подписок.
+
+Читает записи в формате posts.export (NDJSON или CSV с полем type).
+Авторов и группы ищет по username и slug в словарях, загруженных один
+раз, и вставляет строки bulk_create пачками, каждая в своей транзакции.
+Идентификаторы постов выдаются заранее, чтобы комментарии из того же
+файла сразу ссылались на новые посты; поэтому загрузку запускают на
+базе без параллельной записи.
+
+bulk_create не шлёт сигналов: счётчики, ссылки на файлы картинок,
+поисковый индекс и материализованную ленту finish() перестраивает в
+конце.
+"""
+import collections
+import contextlib
+import csv
+import io
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, export, feed, search, stored_images
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def read_records(stream, fmt):
+    """Записи из текстового потока в формате export.NDJSON или export.CSV."""
+    if fmt == export.CSV:
+        for row in csv.DictReader(stream):
+            # В CSV пустая ячейка — отсутствующее значение.
+            yield {key: value or None for key, value in row.items()}
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def open_records(path, fmt=None):
+    """Записи файла; формат по расширению, если не задан."""
+    if fmt is None:
+        fmt = export.CSV if path.endswith(".csv") else export.NDJSON
+    with io.open(path, encoding="utf-8", newline="") as stream:
+        yield from read_records(stream, fmt)
+
+
+@contextlib.contextmanager
+def keep_created(*models):
+    """
+    auto_now_add подставляет текущее время и при bulk_create; на время
+    загрузки отключаем его, чтобы сохранить даты из выгрузки.
+    """
+    fields = [model._meta.get_field("created") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    def __init__(
+        self, batch_size=BATCH_SIZE, create_users=False, images_dir=None
+    ):
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.images_dir = images_dir
+        self.users = dict(
+            User.objects.values_list("username", "pk").iterator(
+                chunk_size=batch_size
+            )
+        )
+        self.groups = dict(
+            Group.objects.exclude(slug=None).values_list("slug", "pk")
+        )
+        self.next_post_id = Post.objects.aggregate(Max("pk"))["pk__max"] or 0
+        # id поста в выгрузке → id созданного поста.
+        self.post_ids = {}
+        self.pending = {name: [] for name in export.TABLES}
+        self.stats = collections.Counter()
+
+    def skip(self, reason):
+        self.stats[f"пропущено: {reason}"] += 1
+
+    def load(self, records):
+        with keep_created(Post, Comment, Follow):
+            for record in records:
+                self.add(record)
+            for name in export.TABLES:
+                self.flush(name)
+
+    def add(self, record):
+        name = record.get("type")
+        build = getattr(self, f"build_{name}", None)
+        if name not in export.TABLES or build is None:
+            self.skip("неизвестный тип")
+            return
+        obj = build(record)
+        if obj is None:
+            return
+        pending = self.pending[name]
+        pending.append(obj)
+        if len(pending) >= self.batch_size:
+            self.flush(name)
+
+    def flush(self, name):
+        # Сначала пишем таблицы, на которые ссылаются строки этой.
+        for dependency in export.TABLES:
+            if dependency == name:
+                break
+            if self.pending[dependency]:
+                self.flush(dependency)
+        objs, self.pending[name] = self.pending[name], []
+        if not objs:
+            return
+        model = export.TABLES[name].model
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objs, ignore_conflicts=model in (Group, Follow)
+            )
+        if model is Group:
+            self.groups.update(
+                Group.objects.filter(
+                    slug__in=[group.slug for group in objs]
+                ).values_list("slug", "pk")
+            )
+        self.stats[name] += len(objs)
+
+    def user_id(self, username):
+        if not username:
+            return None
+        if username not in self.users and self.create_users:
+            user = User(username=username, is_active=False)
+            user.set_unusable_password()
+            user.save()
+            self.users[username] = user.pk
+            self.stats["создано пользователей"] += 1
+        return self.users.get(username)
+
+    def created(self, value):
+        return (value and parse_datetime(value)) or timezone.now()
+
+    def image(self, name):
+        if not name:
+            return ""
+        storage = stored_images.get_storage()
+        if self.images_dir is None:
+            if storage.exists(name):
+                return name
+        else:
+            path = os.path.join(self.images_dir, name)
+            if os.path.isfile(path):
+                with open(path, "rb") as source:
+                    return storage.save(
+                        f"posts/{os.path.basename(path)}", File(source)
+                    )
+        self.stats["картинок не найдено"] += 1
+        return ""
+
+    def build_groups(self, record):
+        if not record.get("slug") or record["slug"] in self.groups:
+            self.skip("группа уже есть")
+            return None
+        return Group(
+            slug=record["slug"],
+            title=record.get("title") or record["slug"],
+            description=record.get("description") or "",
+        )
+
+    def build_posts(self, record):
+        author_id = self.user_id(record.get("author"))
+        if author_id is None:
+            self.skip("нет автора")
+            return None
+        slug = record.get("group")
+        if slug and slug not in self.groups and self.pending["groups"]:
+            # Группа могла прийти в том же файле и ждать своей пачки.
+            self.flush("groups")
+        self.next_post_id += 1
+        if record.get("id") is not None:
+            self.post_ids[int(record["id"])] = self.next_post_id
+        return Post(
+            pk=self.next_post_id,
+            author_id=author_id,
+            group_id=self.groups.get(slug),
+            text=record.get("text") or "",
+            image=self.image(record.get("image")),
+            created=self.created(record.get("created")),
+        )
+
+    def build_comments(self, record):
+        author_id = self.user_id(record.get("author"))
+        post_id = self.post_ids.get(int(record.get("post") or 0))
+        if author_id is None or post_id is None:
+            self.skip("нет автора или поста")
+            return None
+        return Comment(
+            post_id=post_id,
+            author_id=author_id,
+            text=record.get("text") or "",
+            created=self.created(record.get("created")),
+        )
+
+    def build_follows(self, record):
+        user_id = self.user_id(record.get("user"))
+        author_id = self.user_id(record.get("author"))
+        if user_id is None or author_id is None or user_id == author_id:
+            self.skip("неверная подписка")
+            return None
+        return Follow(
+            user_id=user_id,
+            author_id=author_id,
+            created=self.created(record.get("created")),
+        )
+
+    def finish(self, reindex=True):
+        """Приводит в порядок всё, что обычно делают сигналы."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Group, Post, Comment, Follow]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        counters.reconcile()
+        stored_images.recount()
+        if reindex:
+            search.rebuild()
+            if feed.is_materialized():
+                feed.rebuild()
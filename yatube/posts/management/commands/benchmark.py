@@ -0,0 +1,151 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержку (p50/p95/p99), число SQL-запросов и время "
+        "отрисовки шаблонов страниц posts.urls и сверяет с эталоном."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--only", nargs="+", help="Имена представлений для замера."
+        )
+        parser.add_argument(
+            "--anonymous",
+            action="store_true",
+            help="Ходить без входа (иначе — подписчик с наибольшей лентой).",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кэш перед каждым запросом.",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Снять планы запросов и показать сортировки в памяти.",
+        )
+        parser.add_argument(
+            "--render",
+            action="store_true",
+            help="Сравнить время отрисовки страниц лент без кэширующего "
+            "загрузчика шаблонов и с ним.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Число читающих потоков: замер пропускной способности "
+            "без записи и под записью вместо задержек.",
+        )
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=1,
+            help="Число пишущих потоков для --concurrency.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=5.0,
+            help="Длительность каждой фазы --concurrency, секунд.",
+        )
+        parser.add_argument(
+            "--baseline", help="JSON-эталон, с которым сверить результат."
+        )
+        parser.add_argument(
+            "--save-baseline", help="Сохранить результат как эталон."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимый рост p95 относительно эталона (доля).",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations должен быть положительным")
+        if options["render"]:
+            self.render(options)
+            return
+        if options["concurrency"] is not None:
+            self.concurrent(options)
+            return
+        self.measure(options)
+
+    def measure(self, options):
+        results = benchmark.run(
+            iterations=options["iterations"],
+            anonymous=options["anonymous"],
+            cold=options["cold"],
+            only=options["only"],
+            explain=options["explain"],
+        )
+        self.stdout.write(
+            f"{'view':<16} {'status':>6} {'sql':>5} "
+            f"{'p50':>9} {'p95':>9} {'p99':>9} {'render':>7}  url"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16} {result['status']:>6} {result['queries']:>5} "
+                f"{result['p50']:>9} {result['p95']:>9} {result['p99']:>9} "
+                f"{str(result['render']):>7}  {result['url']}"
+            )
+        for name, result in results.items():
+            for query in result.get("sorted", ()):
+                self.stdout.write(
+                    self.style.WARNING(f"{name}: {query['sql']}")
+                )
+                for line in query["plan"].splitlines():
+                    self.stdout.write(f"  {line}")
+        if options["save_baseline"]:
+            benchmark.save_baseline(options["save_baseline"], results)
+        if options["baseline"]:
+            problems = benchmark.compare(
+                results,
+                benchmark.load_baseline(options["baseline"]),
+                tolerance=options["tolerance"],
+            )
+            if problems:
+                raise CommandError("Регрессии:\n" + "\n".join(problems))
+            self.stdout.write(self.style.SUCCESS("Регрессий нет."))
+
+    def render(self, options):
+        rows = benchmark.render_times(
+            iterations=options["iterations"], anonymous=options["anonymous"]
+        )
+        self.stdout.write(
+            f"{'view':<16} {'plain':>9} {'cached':>9} {'change':>8}  url"
+        )
+        for name, row in rows.items():
+            change = ""
+            if row.get("plain") and row.get("cached") is not None:
+                change = f"{(row['cached'] / row['plain'] - 1) * 100:+.0f}%"
+            self.stdout.write(
+                f"{name:<16} {str(row.get('plain')):>9} "
+                f"{str(row.get('cached')):>9} {change:>8}  {row['url']}"
+            )
+
+    def concurrent(self, options):
+        if options["concurrency"] < 1 or options["writers"] < 0:
+            raise CommandError("Неверное число потоков")
+        phases = benchmark.concurrent(
+            readers=options["concurrency"],
+            writers=options["writers"],
+            duration=options["duration"],
+            anonymous=options["anonymous"],
+        )
+        self.stdout.write(
+            f"{'phase':<10} {'reads/s':>9} {'read p95':>9} "
+            f"{'writes/s':>9} {'errors':>7}"
+        )
+        for name, phase in phases.items():
+            self.stdout.write(
+                f"{name:<10} {phase['reads_per_s']:>9} "
+                f"{str(phase['read_p95']):>9} "
+                f"{phase['writes_per_s']:>9} {phase['errors']:>7}"
+            )
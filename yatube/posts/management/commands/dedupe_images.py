@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts import stored_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Объединяет одинаковые файлы картинок постов в media/posts/, "
+        "переводит посты на один файл, заново считает ссылки на файлы "
+        "и удаляет файлы без постов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать копии, ничего не меняя.",
+        )
+
+    def handle(self, *args, **options):
+        report = stored_images.dedupe(dry_run=options["dry_run"])
+        freed = filesizeformat(report["freed"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Файлов: {report['files']}, копий: {report['duplicates']}, "
+                f"без постов: {report['orphans']}, "
+                f"постов переведено: {report['posts']}, "
+                f"освобождено: {freed} ({report['freed']} байт)"
+            )
+        )
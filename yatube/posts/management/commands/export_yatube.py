@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from posts import export
+
+
+def _date(value):
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise CommandError(f"Неверная дата {value}: нужен формат ГГГГ-ММ-ДД")
+    return date
+
+
+class Command(BaseCommand):
+    help = "Выгружает группы, посты, комментарии и подписки в NDJSON или CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=export.FORMATS, default=export.NDJSON
+        )
+        parser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(export.TABLES),
+            help="Какие таблицы выгрузить (по умолчанию все).",
+        )
+        parser.add_argument("--since", help="С даты создания (ГГГГ-ММ-ДД).")
+        parser.add_argument("--until", help="По дату создания (ГГГГ-ММ-ДД).")
+        parser.add_argument(
+            "--author", help="Только записи пользователя (username)."
+        )
+        parser.add_argument(
+            "--output", "-o", help="Файл выгрузки (по умолчанию stdout)."
+        )
+
+    def handle(self, *args, **options):
+        lines = export.lines(
+            options["format"],
+            options["tables"],
+            since=options["since"] and _date(options["since"]),
+            until=options["until"] and _date(options["until"]),
+            author=options["author"],
+        )
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        total = 0
+        with open(
+            options["output"], "w", encoding="utf-8", newline=""
+        ) as output:
+            for line in lines:
+                output.write(line)
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f"Записано строк: {total}"))
@@ -0,0 +1,75 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export, importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает группы, посты, комментарии и подписки из NDJSON или CSV "
+        "(формат export_yatube)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл выгрузки или - для stdin.")
+        parser.add_argument(
+            "--format",
+            choices=export.FORMATS,
+            help="Формат файла (по умолчанию по расширению).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=importer.BATCH_SIZE
+        )
+        parser.add_argument(
+            "--create-users",
+            action="store_true",
+            help="Создавать неактивных пользователей для неизвестных имён.",
+        )
+        parser.add_argument(
+            "--images-dir",
+            help="Каталог, относительно которого лежат картинки постов.",
+        )
+        parser.add_argument(
+            "--skip-reindex",
+            action="store_true",
+            help="Не перестраивать поисковый индекс и ленту подписок.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть положительным")
+        if options["path"] == "-":
+            records = importer.read_records(
+                sys.stdin, options["format"] or export.NDJSON
+            )
+        else:
+            records = importer.open_records(
+                options["path"], options["format"]
+            )
+        loader = importer.Importer(
+            batch_size=options["batch_size"],
+            create_users=options["create_users"],
+            images_dir=options["images_dir"],
+        )
+        started = time.monotonic()
+        try:
+            loader.load(records)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Не удалось прочитать выгрузку: {error}")
+        elapsed = time.monotonic() - started
+        loader.finish(reindex=not options["skip_reindex"])
+        total = sum(loader.stats[name] for name in export.TABLES)
+        for name, value in sorted(loader.stats.items()):
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено строк: {total} за {elapsed:.1f} с "
+                f"({total / max(elapsed, 1e-6):.0f} строк/с)"
+            )
+        )
+        if loader.stats["posts"]:
+            self.stdout.write(
+                "Миниатюры новых картинок готовит generate_thumbnails."
+            )
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Перестраивает материализованную ленту подписок (posts.FeedItem)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Перестроить ленту только этого пользователя (username).",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f"Пользователь {options['user']} не найден"
+                )
+        if not feed.is_materialized():
+            self.stderr.write(
+                "FOLLOW_FEED_MODE не равен "
+                f'"{feed.FEED_MODE_MATERIALIZED}": лента будет построена, '
+                "но /follow/ продолжит читать соединение Follow и Post."
+            )
+        total = feed.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f"Записей в ленте: {total}"))
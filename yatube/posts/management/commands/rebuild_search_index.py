@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс постов и комментариев."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        total = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проиндексировано документов: {total} ({backend.name})"
+            )
+        )
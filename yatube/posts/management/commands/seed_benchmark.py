@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими данными для замеров benchmark: "
+        f"пользователи {benchmark.PREFIX}_N, группы {benchmark.PREFIX}-N."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--follows", type=int, default=10_000_000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--comments", type=int, default=0)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько последних дней раскидать даты создания.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=benchmark.BATCH_SIZE
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Сначала удалить данные предыдущего заполнения.",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            benchmark.clear()
+        created = benchmark.seed(
+            users=options["users"],
+            posts=options["posts"],
+            follows=options["follows"],
+            groups=options["groups"],
+            comments=options["comments"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            random_seed=options["seed"],
+            log=self.stdout.write,
+        )
+        summary = ", ".join(
+            f"{name}: {total}" for name, total in created.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f"Создано — {summary}"))
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.models import Group
+from posts.pagination import is_cursor_mode
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогревает кэш карточек после выкладки: отрисовывает первые "
+        "страницы главной, всех групп и самых активных авторов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=1,
+            help="Сколько первых страниц каждой ленты отрисовать.",
+        )
+        parser.add_argument(
+            "--profiles",
+            type=int,
+            default=20,
+            help="Сколько профилей авторов с наибольшим числом постов.",
+        )
+
+    def handle(self, *args, **options):
+        self.factory = RequestFactory()
+        # В курсорном режиме номера страниц нет: греем только первую.
+        pages = 1 if is_cursor_mode() else options["pages"]
+        urls = [reverse("posts:index")]
+        urls += [
+            reverse("posts:group_list", kwargs={"slug": slug})
+            for slug in Group.objects.exclude(slug=None).values_list(
+                "slug", flat=True
+            )
+        ]
+        authors = (
+            User.objects.annotate(posts_count=Count("posts"))
+            .filter(posts_count__gt=0)
+            .order_by("-posts_count")
+            .values_list("username", flat=True)[: options["profiles"]]
+        )
+        urls += [
+            reverse("posts:profile", kwargs={"username": username})
+            for username in authors
+        ]
+        rendered = 0
+        for url in urls:
+            for page in range(1, pages + 1):
+                status = self.render(f"{url}?page={page}" if page > 1 else url)
+                if status != 200:
+                    self.stderr.write(f"{url} (стр. {page}): {status}")
+                    break
+                rendered += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Отрисовано страниц: {rendered}")
+        )
+
+    def render(self, url: str) -> int:
+        request = self.factory.get(url)
+        request.user = AnonymousUser()
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        return response.status_code
@@ -0,0 +1,82 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+INDEXES = (
+    (
+        "comment",
+        models.Index(
+            fields=["post", "-created", "-id"],
+            name="comment_post_created_idx",
+        ),
+    ),
+    (
+        "post",
+        models.Index(fields=["-created", "-id"], name="post_created_idx"),
+    ),
+    (
+        "post",
+        models.Index(
+            fields=["author", "-created", "-id"],
+            name="post_author_created_idx",
+        ),
+    ),
+    (
+        "post",
+        models.Index(
+            fields=["group", "-created", "-id"],
+            name="post_group_created_idx",
+        ),
+    ),
+)
+
+
+def create_indexes(apps, schema_editor):
+    # На PostgreSQL строим индексы CONCURRENTLY, чтобы не блокировать
+    # запись в большие таблицы; поэтому миграция не атомарная.
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for model_name, index in INDEXES:
+        model = apps.get_model("posts", model_name)
+        if not concurrently:
+            schema_editor.add_index(model, index)
+            continue
+        sql = str(index.create_sql(model, schema_editor))
+        schema_editor.execute(
+            sql.replace(
+                "CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1
+            )
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for model_name, index in INDEXES:
+        model = apps.get_model("posts", model_name)
+        if not concurrently:
+            schema_editor.remove_index(model, index)
+            continue
+        schema_editor.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS %s"
+            % schema_editor.quote_name(index.name)
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('posts', '0019_search'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:10
+
+from django.db import migrations
+
+# Индексы, которые есть только у PostgreSQL. Выражение GIN-индексов
+# совпадает с тем, что ищет posts.search.PostgresBackend.
+INDEXES = (
+    (
+        "post_text_search_idx",
+        "posts_post USING gin (to_tsvector('russian', text))",
+    ),
+    (
+        "comment_text_search_idx",
+        "posts_comment USING gin (to_tsvector('russian', text))",
+    ),
+    # generate_thumbnails ищет посты с картинкой без миниатюры: таких
+    # немного, и частичный индекс не растёт вместе с таблицей.
+    (
+        "post_thumbnail_pending_idx",
+        "posts_post (id) WHERE image <> '' AND thumbnail_url = ''",
+    ),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in INDEXES:
+        schema_editor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS %s ON %s"
+            % (schema_editor.quote_name(name), definition)
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS %s"
+            % schema_editor.quote_name(name)
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('posts', '0020_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:22
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_postgres_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('refs', models.IntegerField(default=0, verbose_name='Ссылок')),
+                ('thumbnail_url', models.CharField(blank=True, max_length=255, verbose_name='Адрес миниатюры')),
+                ('thumbnail_width', models.PositiveIntegerField(null=True, verbose_name='Ширина миниатюры')),
+                ('thumbnail_height', models.PositiveIntegerField(null=True, verbose_name='Высота миниатюры')),
+                ('image_variants', models.TextField(blank=True, verbose_name='Варианты картинки')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Добавьте картинку', storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
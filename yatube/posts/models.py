@@ -2,6 +2,8 @@ from core.models import CreatedModel
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 # from django.db.models import Q
 
 User = get_user_model()
@@ -44,11 +46,37 @@ class Post(CreatedModel):
     image = models.ImageField(
         "Картинка",
         upload_to="posts/",
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text="Добавьте картинку",
     )
     # Аргумент upload_to указывает директорию,
     # в которую будут загружаться пользовательские файлы.
+    # Миниатюру картинки для лент готовит фоновый воркер
+    # (posts.thumbnails), шаблоны выводят готовый адрес.
+    thumbnail_url = models.CharField(
+        "Адрес миниатюры",
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+    thumbnail_width = models.PositiveIntegerField(
+        "Ширина миниатюры",
+        null=True,
+        editable=False,
+    )
+    thumbnail_height = models.PositiveIntegerField(
+        "Высота миниатюры",
+        null=True,
+        editable=False,
+    )
+    # Варианты картинки разной ширины и формата для srcset (JSON-список,
+    # см. posts.images).
+    image_variants = models.TextField(
+        "Варианты картинки",
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = (
@@ -57,6 +85,21 @@ class Post(CreatedModel):
         )
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # Индексы повторяют сортировку лент, чтобы страница читалась
+        # диапазоном индекса без сортировки в памяти.
+        indexes = [
+            models.Index(
+                fields=["-created", "-id"], name="post_created_idx"
+            ),
+            models.Index(
+                fields=["author", "-created", "-id"],
+                name="post_author_created_idx",
+            ),
+            models.Index(
+                fields=["group", "-created", "-id"],
+                name="post_group_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -84,6 +127,12 @@ class Comment(CreatedModel):
         ordering = ("-created",)
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "-created", "-id"],
+                name="comment_post_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:20]
@@ -119,3 +168,127 @@ class Follow(CreatedModel):
 
     def __str__(self) -> str:
         return f"{self.user} подписан на {self.author}"
+
+
+class FeedItem(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Пост",
+    )
+    # Копия Post.created: лента читается диапазоном по (user, created)
+    # без соединения с таблицей постов.
+    created = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = (
+            "-created",
+            "-post",
+        )
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        indexes = [
+            models.Index(
+                fields=["user", "-created", "-post"],
+                name="feed_user_created_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_feed_item"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.post} в ленте {self.user}"
+
+
+class Counter(models.Model):
+    """Хранимое значение счётчика, чтобы не считать COUNT(*) на лету."""
+
+    key = models.CharField("Ключ", max_length=64, unique=True)
+    value = models.BigIntegerField("Значение", default=0)
+
+    class Meta:
+        verbose_name = "Счётчик"
+        verbose_name_plural = "Счётчики"
+
+    def __str__(self) -> str:
+        return f"{self.key} = {self.value}"
+
+
+class SearchPosting(models.Model):
+    """
+    Запись инвертированного индекса поиска: слово встречается в посте или
+    комментарии столько-то раз. Используется, когда в базе нет FTS5.
+    """
+
+    POST = "post"
+    COMMENT = "comment"
+    KINDS = (
+        (POST, "Пост"),
+        (COMMENT, "Комментарий"),
+    )
+
+    term = models.CharField("Слово", max_length=64)
+    kind = models.CharField("Тип документа", max_length=7, choices=KINDS)
+    doc_id = models.PositiveIntegerField("Документ")
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Пост",
+    )
+    frequency = models.PositiveIntegerField("Частота")
+
+    class Meta:
+        verbose_name = "Запись поискового индекса"
+        verbose_name_plural = "Записи поискового индекса"
+        indexes = [
+            models.Index(
+                fields=["term", "kind", "doc_id"], name="search_term_idx"
+            ),
+            models.Index(fields=["kind", "doc_id"], name="search_doc_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.term}: {self.kind} {self.doc_id}"
+
+
+class StoredImage(models.Model):
+    """
+    Файл картинки постов по хешу содержимого (posts.storage): сколько
+    постов на него ссылается и готовые для него миниатюра и варианты.
+    """
+
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    name = models.CharField("Файл", max_length=255, unique=True)
+    size = models.BigIntegerField("Размер")
+    # Не Positive: уменьшение до удаления записи не должно падать.
+    refs = models.IntegerField("Ссылок", default=0)
+    thumbnail_url = models.CharField(
+        "Адрес миниатюры", max_length=255, blank=True
+    )
+    thumbnail_width = models.PositiveIntegerField(
+        "Ширина миниатюры", null=True
+    )
+    thumbnail_height = models.PositiveIntegerField(
+        "Высота миниатюры", null=True
+    )
+    image_variants = models.TextField("Варианты картинки", blank=True)
+
+    class Meta:
+        verbose_name = "Файл картинки"
+        verbose_name_plural = "Файлы картинок"
+
+    def __str__(self) -> str:
+        return self.name
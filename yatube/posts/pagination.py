@@ -0,0 +1,212 @@
+"""Постраничный вывод: номера страниц или курсоры по ключу сортировки."""
+import base64
+import collections.abc
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+PAGINATION_PAGE = "page"
+PAGINATION_CURSOR = "cursor"
+
+FORWARD = "n"
+BACKWARD = "p"
+
+
+def is_cursor_mode() -> bool:
+    return settings.POSTS_PAGINATION == PAGINATION_CURSOR
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница курсорной выдачи, совместимая с page_obj в шаблонах."""
+
+    is_cursor = True
+    # Номера страницы у курсорной выдачи нет.
+    number = None
+
+    def __init__(self, object_list, paginator, cursor="",
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage {self.cursor or 'first'}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорный (keyset) паджинатор.
+
+    Страница выбирается условием по ключу сортировки, а не OFFSET, и
+    без COUNT(*), поэтому глубокие страницы стоят столько же, сколько
+    первая. Ключ берётся из order_by() выборки или Meta.ordering модели и
+    должен быть уникальным (например, ("-created", "-pk")). Поля ключа
+    читаются атрибутами объектов, поэтому для полей связанных моделей
+    используйте аннотации.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(
+            ordering
+            or object_list.query.order_by
+            or object_list.model._meta.ordering
+        )
+
+    def _fields(self):
+        return [
+            (name.lstrip("-"), name.startswith("-")) for name in self.ordering
+        ]
+
+    def _value(self, obj, name):
+        try:
+            name = obj._meta.get_field(name).attname
+        except FieldDoesNotExist:
+            # pk или аннотация выборки.
+            pass
+        value = getattr(obj, name)
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+    def encode_cursor(self, obj, direction) -> str:
+        values = [self._value(obj, name) for name, _ in self._fields()]
+        raw = json.dumps([direction, values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token):
+        """
+        Возвращает направление и значения ключа. Значения остаются в
+        JSON-виде: строки дат приводит к типу поля сам ORM.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            direction, values = json.loads(raw.decode())
+        except (ValueError, TypeError):
+            raise InvalidCursor(token)
+        if direction not in (FORWARD, BACKWARD) or (
+            not isinstance(values, list) or len(values) != len(self.ordering)
+        ):
+            raise InvalidCursor(token)
+        return direction, values
+
+    def _keyset(self, values, direction):
+        """Условие «строго после курсора» в заданном направлении."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields(), values):
+            after = descending == (direction == FORWARD)
+            lookup = "lt" if after else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _order(self, direction):
+        if direction == FORWARD:
+            return self.ordering
+        return [
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None) -> CursorPage:
+        """Страница после (или перед) курсором; битый курсор — первая."""
+        direction, values = FORWARD, None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                cursor = ""
+        queryset = self.object_list.order_by(*self._order(direction))
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._keyset(values, direction))
+            except (ValidationError, ValueError, TypeError):
+                return self.get_page()
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], FORWARD)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], BACKWARD)
+        return CursorPage(
+            rows, self, cursor or "", next_cursor, previous_cursor
+        )
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator, берущий число объектов из счётчика (posts.counters), а не
+    из COUNT(*). count может быть числом или функцией без аргументов.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+        return self._count() if callable(self._count) else self._count
+
+
+def paginate(request, queryset, per_page, count=None):
+    """page_obj для выборки в режиме, заданном POSTS_PAGINATION."""
+    if is_cursor_mode():
+        paginator = CursorPaginator(queryset, per_page)
+        return paginator.get_page(request.GET.get("cursor"))
+    paginator = CountedPaginator(queryset, per_page, count=count)
+    return paginator.get_page(request.GET.get("page"))
+
+
+class PaginationMixin:
+    """
+    Подключает к ListView курсорный режим и счётчик из get_count()
+    вместо COUNT(*).
+    """
+
+    def get_count(self):
+        return None
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return CountedPaginator(
+            queryset, per_page, count=self.get_count, **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not is_cursor_mode():
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate(self.request, queryset, page_size)
+        return page.paginator, page, page.object_list, page.has_other_pages()
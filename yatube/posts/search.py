@@ -0,0 +1,415 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+На PostgreSQL ищем прямо по таблицам постов и комментариев через
+to_tsvector: GIN-индексы по этому выражению создаёт миграция, и база
+поддерживает их сама (ранжирование ts_rank, сниппеты ts_headline). На
+SQLite с FTS5 документы лежат в виртуальной таблице posts_search_fts
+(ранжирование bm25, сниппеты средствами FTS5). В остальных случаях
+используется инвертированный индекс posts.SearchPosting: слово → документы
+с частотой, ранжирование tf-idf. Бэкенд выбирается настройкой
+SEARCH_BACKEND ("auto", "postgres", "fts5", "inverted"). Индекс
+обновляется сигналами (posts.signals) и перестраивается командой
+rebuild_search_index.
+
+Выдача ранжирована, поэтому курсор страницы хранит смещение в ней.
+"""
+import base64
+import collections
+import json
+import math
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import counters
+from .models import Comment, Post, SearchPosting
+from .pagination import CursorPage
+
+FTS_TABLE = "posts_search_fts"
+# Словарь PostgreSQL; должен совпадать с выражением GIN-индексов.
+TS_CONFIG = "russian"
+BATCH_SIZE = 1000
+SNIPPET_WORDS = 16
+# Границы совпадения в сниппете до экранирования HTML.
+MARK_START, MARK_END = "\x02", "\x03"
+
+SearchResult = collections.namedtuple(
+    "SearchResult", "kind object_id post_id snippet score"
+)
+
+
+def tokenize(text: str) -> list:
+    return [word[:64] for word in re.findall(r"\w+", text.casefold())]
+
+
+def _highlight(text: str):
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+def _encode_offset(offset: int) -> str:
+    raw = json.dumps({"o": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_offset(cursor) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return max(int(json.loads(raw.decode())["o"]), 0)
+    except (ValueError, TypeError, KeyError):
+        return 0
+
+
+class Fts5Backend:
+    """Виртуальная таблица FTS5: rowid = 2 * id поста или 2 * id + 1."""
+
+    name = "fts5"
+
+    @staticmethod
+    def _rowid(kind, doc_id):
+        return doc_id * 2 + (kind == SearchPosting.COMMENT)
+
+    def add(self, kind, doc_id, post_id, text):
+        rowid = self._rowid(kind, doc_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, post_id) "
+                "VALUES (%s, %s, %s)",
+                [rowid, text, post_id],
+            )
+
+    def remove(self, kind, doc_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [self._rowid(kind, doc_id)],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def add_many(self, documents):
+        rows = [
+            (self._rowid(kind, doc_id), text, post_id)
+            for kind, doc_id, post_id, text in documents
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, post_id) "
+                "VALUES (%s, %s, %s)",
+                rows,
+            )
+
+    def search(self, terms, offset, limit):
+        match = " ".join('"%s"' % term for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, post_id, "
+                f"snippet({FTS_TABLE}, 0, %s, %s, '…', %s), "
+                f"bm25({FTS_TABLE}) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                "ORDER BY score, rowid LIMIT %s OFFSET %s",
+                [MARK_START, MARK_END, SNIPPET_WORDS, match, limit, offset],
+            )
+            rows = cursor.fetchall()
+        return [
+            SearchResult(
+                SearchPosting.COMMENT if rowid % 2 else SearchPosting.POST,
+                rowid // 2,
+                post_id,
+                _highlight(snippet),
+                -score,
+            )
+            for rowid, post_id, snippet, score in rows
+        ]
+
+
+class PostgresBackend:
+    """to_tsvector по постам и комментариям; индекс ведёт сама база."""
+
+    name = "postgres"
+    automatic = True
+
+    def add(self, kind, doc_id, post_id, text):
+        pass
+
+    def remove(self, kind, doc_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def add_many(self, documents):
+        pass
+
+    def search(self, terms, offset, limit):
+        document = f"to_tsvector('{TS_CONFIG}', text)"
+        query = f"plainto_tsquery('{TS_CONFIG}', %s)"
+        match = " ".join(terms)
+        options = (
+            f"StartSel={MARK_START}, StopSel={MARK_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT kind, doc_id, post_id, "
+                f"ts_headline('{TS_CONFIG}', text, {query}, %s), "
+                f"ts_rank(document, {query}) AS score FROM ("
+                f"SELECT %s AS kind, id AS doc_id, id AS post_id, text, "
+                f"{document} AS document FROM {Post._meta.db_table} "
+                f"WHERE {document} @@ {query} "
+                "UNION ALL "
+                f"SELECT %s, id, post_id, text, {document} "
+                f"FROM {Comment._meta.db_table} "
+                f"WHERE {document} @@ {query}"
+                ") AS found ORDER BY score DESC, kind, doc_id "
+                "LIMIT %s OFFSET %s",
+                [
+                    match,
+                    options,
+                    match,
+                    SearchPosting.POST,
+                    match,
+                    SearchPosting.COMMENT,
+                    match,
+                    limit,
+                    offset,
+                ],
+            )
+            rows = cursor.fetchall()
+        return [
+            SearchResult(kind, doc_id, post_id, _highlight(snippet), score)
+            for kind, doc_id, post_id, snippet, score in rows
+        ]
+
+
+class InvertedIndexBackend:
+    """Инвертированный индекс в таблице posts.SearchPosting."""
+
+    name = "inverted"
+
+    @staticmethod
+    def _postings(kind, doc_id, post_id, text):
+        return [
+            SearchPosting(
+                term=term,
+                kind=kind,
+                doc_id=doc_id,
+                post_id=post_id,
+                frequency=frequency,
+            )
+            for term, frequency in collections.Counter(tokenize(text)).items()
+        ]
+
+    def add(self, kind, doc_id, post_id, text):
+        self.remove(kind, doc_id)
+        SearchPosting.objects.bulk_create(
+            self._postings(kind, doc_id, post_id, text)
+        )
+
+    def remove(self, kind, doc_id):
+        SearchPosting.objects.filter(kind=kind, doc_id=doc_id).delete()
+
+    def clear(self):
+        SearchPosting.objects.all().delete()
+
+    def add_many(self, documents):
+        SearchPosting.objects.bulk_create(
+            [
+                posting
+                for document in documents
+                for posting in self._postings(*document)
+            ]
+        )
+
+    def search(self, terms, offset, limit):
+        terms = sorted(set(terms))
+        frequencies = dict(
+            SearchPosting.objects.filter(term__in=terms)
+            .values_list("term")
+            .annotate(documents=Count("pk"))
+            .order_by()
+        )
+        if len(frequencies) < len(terms):
+            return []
+        # Число документов оцениваем по счётчику постов: для idf этого
+        # достаточно, а точный COUNT по индексу дорог.
+        total = max(counters.post_count(), max(frequencies.values()))
+        weight = Case(
+            *[
+                When(
+                    term=term,
+                    then=F("frequency") * Value(
+                        math.log(1 + total / documents)
+                    ),
+                )
+                for term, documents in frequencies.items()
+            ],
+            output_field=FloatField(),
+        )
+        rows = (
+            SearchPosting.objects.filter(term__in=terms)
+            .values("kind", "doc_id", "post_id")
+            .annotate(matched=Count("term"), score=Sum(weight))
+            .filter(matched=len(terms))
+            .order_by("-score", "kind", "doc_id")[offset:offset + limit]
+        )
+        rows = list(rows)
+        texts = {
+            SearchPosting.POST: Post.objects.in_bulk(
+                [row["doc_id"] for row in rows if row["kind"] == "post"]
+            ),
+            SearchPosting.COMMENT: Comment.objects.in_bulk(
+                [row["doc_id"] for row in rows if row["kind"] == "comment"]
+            ),
+        }
+        results = []
+        for row in rows:
+            document = texts[row["kind"]].get(row["doc_id"])
+            text = document.text if document is not None else ""
+            results.append(
+                SearchResult(
+                    row["kind"],
+                    row["doc_id"],
+                    row["post_id"],
+                    _highlight(make_snippet(text, terms)),
+                    row["score"],
+                )
+            )
+        return results
+
+
+def make_snippet(text: str, terms) -> str:
+    """Окно из SNIPPET_WORDS слов вокруг первого совпадения."""
+    words = text.split()
+    terms = set(terms)
+    hits = [
+        index
+        for index, word in enumerate(words)
+        if terms.intersection(tokenize(word))
+    ]
+    start = max((hits[0] if hits else 0) - SNIPPET_WORDS // 2, 0)
+    window = words[start:start + SNIPPET_WORDS]
+    marked = [
+        f"{MARK_START}{word}{MARK_END}"
+        if terms.intersection(tokenize(word))
+        else word
+        for word in window
+    ]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SNIPPET_WORDS < len(words) else ""
+    return prefix + " ".join(marked) + suffix
+
+
+BACKENDS = {
+    PostgresBackend.name: PostgresBackend(),
+    Fts5Backend.name: Fts5Backend(),
+    InvertedIndexBackend.name: InvertedIndexBackend(),
+}
+
+_fts5_tables = {}
+
+
+def fts5_available() -> bool:
+    """Есть ли в текущей базе таблица FTS5 (проверка раз на процесс)."""
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name not in _fts5_tables:
+        _fts5_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts5_tables[name]
+
+
+def available_backends() -> list:
+    """Бэкенды, которые работают на текущей базе, в порядке предпочтения."""
+    names = [InvertedIndexBackend.name]
+    if fts5_available():
+        names.insert(0, Fts5Backend.name)
+    if connection.vendor == "postgresql":
+        names.insert(0, PostgresBackend.name)
+    return names
+
+
+def get_backend():
+    name = settings.SEARCH_BACKEND
+    if name == "auto":
+        name = available_backends()[0]
+    return BACKENDS[name]
+
+
+def index_post(post: Post) -> None:
+    get_backend().add(SearchPosting.POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment: Comment) -> None:
+    get_backend().add(
+        SearchPosting.COMMENT, comment.pk, comment.post_id, comment.text
+    )
+
+
+def remove_post(post_id: int) -> None:
+    get_backend().remove(SearchPosting.POST, post_id)
+
+
+def remove_comment(comment_id: int) -> None:
+    get_backend().remove(SearchPosting.COMMENT, comment_id)
+
+
+def _documents():
+    posts = Post.objects.values_list("pk", "text")
+    for post_id, text in posts.iterator(chunk_size=BATCH_SIZE):
+        yield SearchPosting.POST, post_id, post_id, text
+    comments = Comment.objects.values_list("pk", "post_id", "text")
+    for comment_id, post_id, text in comments.iterator(chunk_size=BATCH_SIZE):
+        yield SearchPosting.COMMENT, comment_id, post_id, text
+
+
+def rebuild() -> int:
+    """Перестраивает индекс активного бэкенда; возвращает число документов."""
+    backend = get_backend()
+    if getattr(backend, "automatic", False):
+        return 0
+    total = 0
+    with transaction.atomic():
+        backend.clear()
+        documents = _documents()
+        batch = list(islice(documents, BATCH_SIZE))
+        while batch:
+            backend.add_many(batch)
+            total += len(batch)
+            batch = list(islice(documents, BATCH_SIZE))
+    return total
+
+
+def search(query: str, cursor=None, per_page: int = 10) -> CursorPage:
+    """Страница результатов поиска, лучшие совпадения сверху."""
+    terms = tokenize(query)
+    offset = _decode_offset(cursor)
+    results = []
+    if terms:
+        results = get_backend().search(terms, offset, per_page + 1)
+    has_next = len(results) > per_page
+    return CursorPage(
+        results[:per_page],
+        None,
+        cursor or "",
+        _encode_offset(offset + per_page) if has_next else None,
+        _encode_offset(max(offset - per_page, 0)) if offset else None,
+    )
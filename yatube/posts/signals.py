@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cards, counters, search, stored_images
+from .models import Comment, Group, Post
+
+User = get_user_model()
+# Поля пользователя, которые выводятся в карточке поста.
+CARD_USER_FIELDS = ("username", "first_name", "last_name")
+
+
+def _group_key(group_id):
+    return counters.group_key(group_id) if group_id else None
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw, **kwargs):
+    # Группу и картинку поста можно сменить при редактировании:
+    # запоминаем прежние, чтобы перенести пост между счётчиками групп и
+    # ссылками на файлы картинок.
+    if instance.pk and not raw:
+        old = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", "image")
+            .first()
+        )
+        if old is not None:
+            instance._old_group_id, instance._old_image = old
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change(
+            counters.TOTAL_KEY,
+            counters.author_key(instance.author_id),
+            _group_key(instance.group_id),
+        )
+        return
+    old_group_id = getattr(instance, "_old_group_id", instance.group_id)
+    if old_group_id != instance.group_id:
+        counters.change(_group_key(old_group_id), delta=-1)
+        counters.change(_group_key(instance.group_id))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(
+        counters.TOTAL_KEY,
+        counters.author_key(instance.author_id),
+        _group_key(instance.group_id),
+        delta=-1,
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    image = instance.image.name or ""
+    old_image = "" if created else getattr(instance, "_old_image", image)
+    if old_image != image:
+        stored_images.retain(image)
+        stored_images.release(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    stored_images.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(counters.comments_key(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change(counters.comments_key(instance.post_id), delta=-1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_card(sender, instance, **kwargs):
+    cards.bump(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_cards(sender, instance, **kwargs):
+    # Название и адрес группы выводятся в карточках её постов.
+    cards.bump_group(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, raw, **kwargs):
+    if instance.pk and not raw:
+        instance._old_card_fields = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*CARD_USER_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def expire_author_cards(sender, instance, created, raw, **kwargs):
+    # Вход пользователя тоже сохраняет его (last_login): карточки
+    # сбрасываются, только если изменилось то, что в них выводится.
+    fields = tuple(getattr(instance, name) for name in CARD_USER_FIELDS)
+    if not created and not raw and (
+        getattr(instance, "_old_card_fields", fields) != fields
+    ):
+        cards.bump_author(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def expire_listings(sender, **kwargs):
+    # Удалённый комментарий выводится под постом: отданные ранее
+    # страницы устарели.
+    cards.bump_listings()
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
@@ -0,0 +1,52 @@
+"""
+Хранилище картинок постов с адресацией по содержимому.
+
+ContentAddressedStorage считает SHA-256 сохраняемого файла. Если файл с
+таким содержимым уже есть (posts.models.StoredImage), возвращается его
+имя и копия не пишется; новый файл сохраняется под обычным именем
+(upload_to) и регистрируется. Сколько постов ссылается на файл, хранит
+StoredImage.refs (posts.stored_images).
+"""
+import hashlib
+
+from django.core.files.storage import FileSystemStorage
+
+
+def content_hash(content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        # models импортирует этот модуль: модель берём при вызове.
+        from .models import StoredImage
+
+        sha256 = content_hash(content)
+        stored = StoredImage.objects.filter(sha256=sha256).first()
+        if stored is not None and self.exists(stored.name):
+            return stored.name
+        name = super()._save(name, content)
+        size = self.size(name)
+        if stored is not None:
+            # Прежний файл пропал с диска: запись переходит на новый.
+            StoredImage.objects.filter(pk=stored.pk).update(
+                name=name,
+                size=size,
+                refs=0,
+                thumbnail_url="",
+                thumbnail_width=None,
+                thumbnail_height=None,
+                image_variants="",
+            )
+            return name
+        stored, created = StoredImage.objects.get_or_create(
+            sha256=sha256, defaults={"name": name, "size": size}
+        )
+        if not created:
+            # Такой же файл успел сохранить параллельный запрос.
+            self.delete(name)
+        return stored.name
@@ -0,0 +1,203 @@
+"""
+Учёт ссылок постов на файлы картинок (posts.storage).
+
+Сигналы постов вызывают retain() для новой картинки поста и release()
+для прежней или удалённой. Когда на файл не остаётся ссылок, после
+фиксации транзакции collect() удаляет его вместе с миниатюрами и
+вариантами. dedupe() объединяет одинаковые файлы, загруженные до
+адресации по содержимому, заново считает ссылки и удаляет файлы без
+постов: запись StoredImage откатывается вместе с транзакцией запроса,
+а сохранённый файл остаётся на диске. recount() заново считает ссылки
+после вставок в обход сигналов (bulk_create).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import cards, images, thumbnails
+from .models import Post, StoredImage
+from .storage import content_hash
+
+# Варианты картинок лежат рядом, но это не загруженные файлы.
+SKIPPED_DIRS = (images.VARIANTS_DIR,)
+# Файл без постов моложе этого может принадлежать транзакции, которая
+# ещё не зафиксирована.
+ORPHAN_MIN_AGE = timedelta(hours=1)
+EMPTY_THUMBNAIL = {
+    "thumbnail_url": "",
+    "thumbnail_width": None,
+    "thumbnail_height": None,
+    "image_variants": "",
+}
+
+
+def get_storage():
+    return Post._meta.get_field("image").storage
+
+
+def retain(name: str) -> None:
+    if name:
+        StoredImage.objects.filter(name=name).update(refs=F("refs") + 1)
+
+
+def release(name: str) -> None:
+    if name and StoredImage.objects.filter(name=name).update(
+        refs=F("refs") - 1
+    ):
+        transaction.on_commit(lambda: collect(name))
+
+
+def collect(name: str) -> int:
+    """Удаляет файл, на который не осталось ссылок."""
+    stored = StoredImage.objects.filter(name=name, refs__lte=0).first()
+    if stored is None or Post.objects.filter(image=name).exists():
+        return 0
+    stored.delete()
+    return remove(name)
+
+
+def recount() -> int:
+    """
+    Заново считает ссылки постов на файлы; файлы, на которые ссылок не
+    осталось, удаляет после фиксации. Возвращает число исправленных
+    записей.
+    """
+    refs = dict(
+        Post.objects.exclude(image="")
+        .order_by()
+        .values("image")
+        .annotate(refs=Count("pk"))
+        .values_list("image", "refs")
+    )
+    fixed = 0
+    for pk, name, old_refs in StoredImage.objects.values_list(
+        "pk", "name", "refs"
+    ).iterator():
+        new_refs = refs.get(name, 0)
+        if new_refs == old_refs:
+            continue
+        StoredImage.objects.filter(pk=pk).update(refs=new_refs)
+        fixed += 1
+        if not new_refs:
+            transaction.on_commit(lambda name=name: collect(name))
+    return fixed
+
+
+def remove(name: str) -> int:
+    """Удаляет файл с миниатюрами и вариантами; возвращает их объём."""
+    storage = get_storage()
+    freed = 0
+    if storage.exists(name):
+        freed = storage.size(name)
+        storage.delete(name)
+    thumbnails.delete(name, storage)
+    return freed + images.delete_variants(name)
+
+
+def walk(storage, directory: str):
+    """Имена всех файлов в directory и вложенных каталогах."""
+    if directory in SKIPPED_DIRS or not storage.exists(directory):
+        return
+    subdirs, files = storage.listdir(directory)
+    for filename in sorted(files):
+        yield f"{directory}/{filename}"
+    for subdir in sorted(subdirs):
+        yield from walk(storage, f"{directory}/{subdir}")
+
+
+def _orphaned(storage, names: list) -> bool:
+    """Ни один пост не ссылается на файлы, и все они не новые."""
+    deadline = timezone.now() - ORPHAN_MIN_AGE
+    return not Post.objects.filter(image__in=names).exists() and all(
+        storage.get_modified_time(name) < deadline for name in names
+    )
+
+
+def _canonical(sha256: str, names: list) -> str:
+    registered = (
+        StoredImage.objects.filter(sha256=sha256, name__in=names)
+        .values_list("name", flat=True)
+        .first()
+    )
+    return registered or names[0]
+
+
+def _merge(sha256: str, canonical: str, duplicates: list) -> list:
+    """Переводит посты на canonical; возвращает id изменённых постов."""
+    shared = (
+        Post.objects.filter(image=canonical)
+        .exclude(thumbnail_url="")
+        .values(*thumbnails.FIELDS)
+        .first()
+    )
+    moved = Post.objects.filter(image__in=duplicates)
+    post_ids = list(moved.values_list("pk", flat=True))
+    # Без готовой миниатюры посты её ждут: см. generate_thumbnails.
+    moved.update(image=canonical, **(shared or EMPTY_THUMBNAIL))
+    # Записи, чей файл с тех пор заменили другим содержимым.
+    StoredImage.objects.filter(name__in=[canonical, *duplicates]).exclude(
+        sha256=sha256
+    ).delete()
+    StoredImage.objects.update_or_create(
+        sha256=sha256,
+        defaults={
+            "name": canonical,
+            "size": get_storage().size(canonical),
+            "refs": Post.objects.filter(image=canonical).count(),
+            **(shared or {}),
+        },
+    )
+    return post_ids
+
+
+def dedupe(dry_run=False) -> dict:
+    """
+    Объединяет одинаковые файлы картинок постов и удаляет файлы без
+    постов. Возвращает число просмотренных файлов, удалённых копий,
+    файлов без постов, переведённых постов и освобождённых байт (при
+    dry_run — только размер самих файлов).
+    """
+    storage = get_storage()
+    directory = Post._meta.get_field("image").upload_to.strip("/")
+    by_hash = defaultdict(list)
+    for name in walk(storage, directory):
+        with storage.open(name) as content:
+            by_hash[content_hash(content)].append(name)
+    report = {
+        "files": 0,
+        "duplicates": 0,
+        "orphans": 0,
+        "posts": 0,
+        "freed": 0,
+    }
+    for sha256, names in by_hash.items():
+        report["files"] += len(names)
+        if _orphaned(storage, names):
+            report["orphans"] += len(names)
+            if dry_run:
+                report["freed"] += sum(storage.size(name) for name in names)
+                continue
+            StoredImage.objects.filter(name__in=names).delete()
+            for name in names:
+                report["freed"] += remove(name)
+            continue
+        canonical = _canonical(sha256, names)
+        duplicates = [name for name in names if name != canonical]
+        report["duplicates"] += len(duplicates)
+        if dry_run:
+            report["freed"] += sum(storage.size(name) for name in duplicates)
+            report["posts"] += Post.objects.filter(
+                image__in=duplicates
+            ).count()
+            continue
+        with transaction.atomic():
+            post_ids = _merge(sha256, canonical, duplicates)
+        report["posts"] += len(post_ids)
+        for post_id in post_ids:
+            cards.bump(post_id)
+        for name in duplicates:
+            report["freed"] += remove(name)
+    return report
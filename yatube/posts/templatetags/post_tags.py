@@ -0,0 +1,40 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards, images
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов ленты из кэша карточек, разделённые линией."""
+    return mark_safe("\n<hr />\n".join(cards.render_cards(posts)))
+
+
+@register.inclusion_tag("posts/includes/post_image.html")
+def post_picture(post):
+    """
+    Картинка поста: <picture> с вариантами разных форматов и ширин, пока
+    их нет — миниатюра или исходная картинка.
+    """
+    return picture_sources(post)
+
+
+@register.simple_tag
+def picture_sources(post):
+    """
+    Контекст post_picture для {% include %}. Карточки ленты подключают
+    posts/includes/post_image.html через include: его шаблон загружается
+    один раз на отрисовку, а inclusion_tag — на каждую карточку.
+    """
+    groups = images.sources(post)
+    fallback = next(
+        (group for group in groups if group["type"] == "image/jpeg"), None
+    )
+    return {
+        "post": post,
+        "sources": [group for group in groups if group is not fallback],
+        "fallback": fallback,
+        "sizes": "(max-width: 960px) 100vw, 960px",
+    }
@@ -1,13 +1,17 @@
+import json
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from .. import thumbnails
 from ..models import Comment, Group, Post
 
 User = get_user_model()
@@ -92,6 +96,58 @@ class PostFormTest(TestCase):
             ).exists()
         )
 
+    def test_post_thumbnail_generated_and_reset(self):
+        """Миниатюра готовится для новой картинки и сбрасывается при замене."""
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile("thumb.gif", small_gif),
+            },
+        )
+        post = Post.objects.get(text="Пост с картинкой")
+        self.assertEqual(post.thumbnail_url, "")
+        # В TestCase on_commit не срабатывает: запускаем воркер вручную.
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_url.startswith(settings.MEDIA_URL))
+        self.assertEqual(
+            (post.thumbnail_width, post.thumbnail_height), (960, 339)
+        )
+        # Картинка уже самой узкой копии: готовится только ширина 480.
+        variants = json.loads(post.image_variants)
+        self.assertIn(
+            {"type": "image/jpeg", "width": 480, "height": 170},
+            [
+                {key: variant[key] for key in ("type", "width", "height")}
+                for variant in variants
+            ],
+        )
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        )
+        self.assertContains(response, "<picture>")
+        self.assertContains(response, "480w")
+        self.authorized_client.post(
+            reverse("posts:post_edit", kwargs={"post_id": post.pk}),
+            data={
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile("other.gif", small_gif),
+            },
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_url, "")
+        self.assertIsNone(post.thumbnail_width)
+        self.assertEqual(post.image_variants, "")
+
     def test_edit_post(self):
         """Валидная форма редактирует запись в Post."""
         # Посчитаем количество записей
@@ -139,6 +195,64 @@ class PostFormTest(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
 
+def image_file(name, size, image_format="PNG", **options):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="uploader")
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, image):
+        return self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с картинкой", "image": image},
+        )
+
+    def test_limits_are_checked_before_decoding(self):
+        cases = (
+            ({"IMAGE_UPLOAD_MAX_SIZE": 100}, "Файл больше 100\xa0байт."),
+            (
+                {"IMAGE_MAX_SIDE": 40},
+                "Картинка больше 40 точек по стороне.",
+            ),
+            ({"IMAGE_MAX_PIXELS": 999}, "В картинке слишком много точек."),
+            (
+                {"IMAGE_UPLOAD_FORMATS": ("JPEG",)},
+                "Формат PNG не поддерживается.",
+            ),
+        )
+        for limits, message in cases:
+            with self.subTest(limits=limits), self.settings(**limits):
+                response = self.upload(image_file("big.png", (50, 20)))
+                self.assertFormError(response, "form", "image", message)
+        self.assertFalse(Post.objects.exists())
+
+    def test_metadata_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        # Orientation 6: снимок повёрнут на 90° по часовой стрелке.
+        exif[0x0112] = 6
+        self.upload(
+            image_file("photo.jpg", (40, 20), "JPEG", exif=exif.tobytes())
+        )
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (20, 40))
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertNotIn("exif", image.info)
+
+
 class CommentFormTest(TestCase):
     @classmethod
     def setUpClass(cls):
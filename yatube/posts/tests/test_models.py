@@ -1,9 +1,22 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 
-from ..models import Group, Post
+from .. import counters, images, importer, stored_images, thumbnails
+from ..models import Comment, Group, Post, StoredImage
 
 User = get_user_model()
+HOUR = timedelta(hours=1)
 
 
 class PostModelTest(TestCase):
@@ -59,3 +72,203 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected
                 )
+
+
+class CounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.group_1 = Group.objects.create(
+            title="Первая группа", slug="group-1", description="Описание"
+        )
+        cls.group_2 = Group.objects.create(
+            title="Вторая группа", slug="group-2", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Текст поста", group=cls.group_1
+        )
+
+    def assertCounts(self, total, author, group_1, group_2):
+        self.assertEqual(counters.post_count(), total)
+        self.assertEqual(counters.post_count(author_id=self.user.pk), author)
+        self.assertEqual(
+            counters.post_count(group_id=self.group_1.pk), group_1
+        )
+        self.assertEqual(
+            counters.post_count(group_id=self.group_2.pk), group_2
+        )
+
+    def test_counters_follow_post_changes(self):
+        """Счётчики постов меняются при создании, правке и удалении."""
+        self.assertCounts(1, 1, 1, 0)
+        post = Post.objects.create(
+            author=self.user, text="Второй пост", group=self.group_1
+        )
+        self.assertCounts(2, 2, 2, 0)
+        post.group = self.group_2
+        post.save()
+        self.assertCounts(2, 2, 1, 1)
+        post.delete()
+        self.assertCounts(1, 1, 1, 0)
+
+    def test_comment_counter(self):
+        self.assertEqual(counters.comment_count(self.post.pk), 0)
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text="Комментарий"
+        )
+        self.assertEqual(counters.comment_count(self.post.pk), 1)
+        comment.delete()
+        self.assertEqual(counters.comment_count(self.post.pk), 0)
+
+    def test_counter_read_does_not_count(self):
+        counters.post_count(author_id=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.post_count(author_id=self.user.pk), 1)
+
+    def test_reconcile_counters_command(self):
+        """reconcile_counters исправляет счётчики после массовых вставок."""
+        self.assertCounts(1, 1, 1, 0)
+        Post.objects.bulk_create(
+            Post(author=self.user, text="Пост %s" % num, group=self.group_2)
+            for num in range(3)
+        )
+        self.assertCounts(1, 1, 1, 0)
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertCounts(4, 4, 1, 3)
+
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01"
+    b"\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00"
+    b"\x00\x0cIDATx\x9cc\xf8\xcf\xc0\x00\x00\x03\x01\x01\x00"
+    b"\xc9\xfe\x92\xef\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+class StoredImageTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.posts_dir = os.path.join(media_root, "posts")
+        self.user = User.objects.create_user(username="auth")
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=SimpleUploadedFile(name, SMALL_GIF),
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post("first.gif")
+        second = self.create_post("second.gif")
+        self.assertEqual(second.image.name, "posts/first.gif")
+        self.assertEqual(os.listdir(self.posts_dir), ["first.gif"])
+        self.assertEqual(StoredImage.objects.get().refs, 2)
+
+        first.delete()
+        self.assertEqual(StoredImage.objects.get().refs, 1)
+        self.assertTrue(os.path.exists(second.image.path))
+        second.delete()
+        self.assertFalse(StoredImage.objects.exists())
+        self.assertEqual(os.listdir(self.posts_dir), [])
+
+    def test_thumbnail_is_reused(self):
+        first = self.create_post("first.gif")
+        thumbnails.generate(first.pk)
+        second = self.create_post("second.gif")
+        with mock.patch.object(thumbnails, "get_thumbnail") as thumbnail:
+            thumbnails.generate(second.pk)
+        thumbnail.assert_not_called()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(second.thumbnail_url, "")
+        self.assertEqual(
+            (second.thumbnail_url, second.image_variants),
+            (first.thumbnail_url, first.image_variants),
+        )
+
+    def test_variants_of_same_stem_are_kept_apart(self):
+        gif = self.create_post("a.gif")
+        png = Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=SimpleUploadedFile("a.png", PNG),
+        )
+        gif_urls = {v["url"] for v in images.build_variants(gif.image)}
+        png_urls = {v["url"] for v in images.build_variants(png.image)}
+        self.assertFalse(gif_urls & png_urls)
+        self.assertGreater(images.delete_variants(gif.image.name), 0)
+        media_root = settings.MEDIA_ROOT
+        for url in png_urls:
+            path = url[len(settings.MEDIA_URL):]
+            self.assertTrue(os.path.exists(os.path.join(media_root, path)))
+
+    def test_dedupe_images_command(self):
+        """dedupe_images объединяет копии, загруженные раньше."""
+        os.makedirs(self.posts_dir)
+        for name in ("a.gif", "b.gif", "c.gif"):
+            with open(os.path.join(self.posts_dir, name), "wb") as f:
+                f.write(SMALL_GIF)
+        for name in ("a.gif", "b.gif", "b.gif"):
+            Post.objects.create(
+                author=self.user, text="Пост", image=f"posts/{name}"
+            )
+        out = StringIO()
+        call_command("dedupe_images", stdout=out)
+        self.assertIn("копий: 2", out.getvalue())
+        self.assertIn(f"({2 * len(SMALL_GIF)} байт)", out.getvalue())
+        self.assertEqual(os.listdir(self.posts_dir), ["a.gif"])
+        self.assertEqual(
+            set(Post.objects.values_list("image", flat=True)),
+            {"posts/a.gif"},
+        )
+        stored = StoredImage.objects.get()
+        self.assertEqual((stored.name, stored.refs), ("posts/a.gif", 3))
+
+    def test_import_counts_image_refs(self):
+        """Посты из bulk_create учтены в ссылках на файл."""
+        images_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, images_dir, ignore_errors=True)
+        for name in ("a.gif", "b.gif"):
+            with open(os.path.join(images_dir, name), "wb") as f:
+                f.write(SMALL_GIF)
+        loader = importer.Importer(images_dir=images_dir)
+        loader.load(
+            {"type": "posts", "author": "auth", "text": "Пост", "image": name}
+            for name in ("a.gif", "b.gif", "a.gif")
+        )
+        loader.finish(reindex=False)
+        self.assertEqual(os.listdir(self.posts_dir), ["a.gif"])
+        stored = StoredImage.objects.get()
+        self.assertEqual((stored.name, stored.refs), ("posts/a.gif", 3))
+
+    def test_files_of_rolled_back_posts_are_collected(self):
+        try:
+            with transaction.atomic():
+                self.create_post("lost.gif")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(os.listdir(self.posts_dir), ["lost.gif"])
+        self.assertFalse(StoredImage.objects.exists())
+        # Свежий файл может принадлежать незафиксированной транзакции.
+        self.assertEqual(stored_images.dedupe()["orphans"], 0)
+        with mock.patch.object(stored_images, "ORPHAN_MIN_AGE", -HOUR):
+            report = stored_images.dedupe()
+        self.assertEqual(report["orphans"], 1)
+        self.assertEqual(report["freed"], len(SMALL_GIF))
+        self.assertEqual(os.listdir(self.posts_dir), [])
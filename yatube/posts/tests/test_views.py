@@ -1,17 +1,30 @@
+import csv
+import json
+import os
 import shutil
 import tempfile
+import time
+from io import StringIO
 from itertools import islice
+from unittest import mock, skipUnless
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import IntegrityError
-from django.test import Client, TestCase, override_settings
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
+from .. import benchmark, cards, counters, search
+from ..models import Comment, FeedItem, Follow, Group, Post
 
 User = get_user_model()
 
@@ -322,6 +335,53 @@ class CommentViewTest(TestCase):
         )
 
 
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(author=cls.user, text="Текст поста")
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text="Комментарий %s" % n)
+            for n in range(12)
+        )
+
+    def test_post_detail_shows_first_comments(self):
+        """Под постом выводится первая порция комментариев."""
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), 5)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, "js-more-comments")
+
+    def test_comment_list_loads_remaining_chunks(self):
+        """Фрагмент comment_list догружает оставшиеся комментарии."""
+        url = reverse("posts:comment_list", kwargs={"post_id": self.post.pk})
+        comments = self.client.get(url).context["comments"]
+        seen = [comment.pk for comment in comments]
+        while comments.has_next():
+            response = self.client.get(url + "?cursor=" + comments.next_cursor)
+            self.assertTemplateNotUsed(response, "base.html")
+            comments = response.context["comments"]
+            seen.extend(comment.pk for comment in comments)
+        self.assertEqual(
+            seen,
+            list(
+                self.post.comments.order_by("-created", "-pk").values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+
+    def test_comment_authors_are_joined(self):
+        url = reverse("posts:comment_list", kwargs={"post_id": self.post.pk})
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
 class PostCacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -333,23 +393,166 @@ class PostCacheTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
 
-    def test_index_cached(self):
-        """Тест работы кэширования главной страницы."""
-        posts_count = Post.objects.count()
+    def test_index_cards_cached(self):
+        """Карточки постов главной страницы берутся из кэша."""
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertTemplateUsed(response, "posts/includes/post_list.html")
         response = self.guest_client.get(reverse("posts:index"))
-        cache_content = response.content
-        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTemplateNotUsed(response, "posts/includes/post_list.html")
+        self.assertContains(response, "Текст поста")
+
+    def test_cards_rendered_in_one_pass(self):
+        """Несколько карточек отрисовываются одним проходом шаблона."""
+        posts = [
+            self.post,
+            Post.objects.create(author=self.user, text="Второй пост"),
+        ]
+        with self.assertTemplateUsed(cards.CARDS_TEMPLATE):
+            rendered = cards.render_cards(posts)
+        self.assertEqual(len(rendered), len(posts))
+        for post, html in zip(posts, rendered):
+            self.assertIn(post.text, html)
+            self.assertEqual(html.count("<article>"), 1)
+        with self.assertTemplateNotUsed(cards.CARDS_TEMPLATE):
+            self.assertEqual(cards.render_cards(posts), rendered)
+
+    def test_index_shows_edits_immediately(self):
+        """Правка и удаление поста сразу видны на главной странице."""
+        self.guest_client.get(reverse("posts:index"))
+        self.post.text = "Исправленный текст"
+        self.post.save()
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertContains(response, "Исправленный текст")
         self.post.delete()
         response = self.guest_client.get(reverse("posts:index"))
-        self.assertEqual(Post.objects.count(), posts_count - 1)
-        self.assertIn(cache_content, response.content)
-        cache.clear()
+        self.assertNotContains(response, "Исправленный текст")
+
+    def test_index_shows_author_and_group_renames(self):
+        """Переименование автора и группы сразу видно в карточках."""
+        group = Group.objects.create(title="Старая группа", slug="cards")
+        self.post.group = group
+        self.post.save()
+        self.guest_client.get(reverse("posts:index"))
+        group.title = "Новая группа"
+        group.save()
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = "Лев"
+        author.save()
         response = self.guest_client.get(reverse("posts:index"))
-        content_cache_clear = response.content
-        self.assertNotEqual(cache_content, content_cache_clear)
+        self.assertContains(response, "Новая группа")
+        self.assertContains(response, "Лев")
+
+    def test_warm_cache_command_renders_cards(self):
+        """warm_cache заранее кладёт карточки лент в кэш."""
+        group = Group.objects.create(title="Группа", slug="warm")
+        Post.objects.create(author=self.user, group=group, text="В группе")
+        call_command("warm_cache", stdout=StringIO())
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": "warm"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTemplateNotUsed(
+                    response, "posts/includes/post_list.html"
+                )
+
+
+class CardCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="auth")
+        self.post = Post.objects.create(author=self.user, text="Текст поста")
+
+    def test_card_rendered_before_commit_is_not_kept(self):
+        """Карточка, отрисованная до фиксации правки, устаревает."""
+        stale = Post.objects.select_related("author", "group").get(
+            pk=self.post.pk
+        )
+        with transaction.atomic():
+            self.post.text = "Исправленный текст"
+            self.post.save()
+            # Читатель из другого соединения ещё видит прежнюю строку.
+            cards.render_cards([stale])
+            stamp = cards.listing_stamp()
+        self.assertNotEqual(cards.listing_stamp(), stamp)
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "Исправленный текст")
+        self.assertNotContains(response, "Текст поста")
+
+
+class HttpCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(author=cls.user, text="Текст поста")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_have_validators(self):
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header("Last-Modified"))
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("Cookie", response["Vary"])
+                response = self.client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+                    HTTP_IF_NONE_MATCH=response["ETag"],
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_skips_rendering(self):
+        url = reverse("posts:index")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, "posts/index.html")
+
+    def test_changes_invalidate_validators(self):
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        etag = self.client.get(url)["ETag"]
+        self.post.text = "Исправленный текст"
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Исправленный текст")
+        etag = response["ETag"]
+        Comment.objects.create(post=self.post, author=self.user, text="Ответ")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Ответ")
+
+    def test_edits_change_last_modified(self):
+        """Правка и удаление не меняют время последнего поста."""
+        url = reverse("posts:index")
+        last_modified = self.client.get(url)["Last-Modified"]
+        with mock.patch.object(cards, "time") as clock:
+            clock.time.return_value = time.time() + 60
+            self.post.text = "Исправленный текст"
+            self.post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertContains(response, "Исправленный текст")
+        self.assertNotEqual(response["Last-Modified"], last_modified)
+
+    def test_authorized_pages_are_not_public(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("posts:index"))
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assertNotIn("public", response.get("Cache-Control", ""))
 
 
 class FollowTest(TestCase):
@@ -453,3 +656,440 @@ class FollowTest(TestCase):
             Follow.objects.create(
                 user=self.user_follower, author=self.user_follower
             )
+
+
+@override_settings(FOLLOW_FEED_MODE="materialized")
+class MaterializedFollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_follower = User.objects.create_user(username="follower")
+        cls.user_author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            text="Старый пост автора",
+        )
+
+    def setUp(self):
+        self.client_follower = Client()
+        self.client_follower.force_login(self.user_follower)
+        self.client_author = Client()
+        self.client_author.force_login(self.user_author)
+
+    def follow_page(self):
+        response = self.client_follower.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_follow_backfills_and_unfollow_prunes_feed(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        self.client_follower.get(
+            reverse(
+                "posts:profile_follow",
+                kwargs={"username": self.user_author.username},
+            )
+        )
+        self.assertEqual(self.follow_page(), [self.post])
+        self.client_follower.get(
+            reverse(
+                "posts:profile_unfollow",
+                kwargs={"username": self.user_author.username},
+            )
+        )
+        self.assertEqual(self.follow_page(), [])
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.user_follower).exists()
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        self.client_author.post(
+            reverse("posts:post_create"), data={"text": "Новый пост"}
+        )
+        self.assertEqual(
+            [post.text for post in self.follow_page()], ["Новый пост"]
+        )
+
+    def test_rebuild_follow_feed_command(self):
+        """Команда rebuild_follow_feed восстанавливает ленту."""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        self.assertEqual(self.follow_page(), [])
+        call_command("rebuild_follow_feed", stdout=StringIO())
+        self.assertEqual(self.follow_page(), [self.post])
+
+
+@override_settings(POSTS_PAGINATION="cursor")
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.follower = User.objects.create_user(username="follower")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(
+                author=cls.author,
+                text="Текст поста %s" % post_num,
+                group=cls.group,
+            )
+            for post_num in range(NUMBER_OF_POSTS)
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.follower)
+
+    def walk(self, url):
+        """Проходит ленту вперёд и назад по курсорам."""
+        forward = []
+        page = self.client.get(url).context["page_obj"]
+        forward.append([post.pk for post in page])
+        while page.has_next():
+            page = self.client.get(
+                url + "?cursor=" + page.next_cursor
+            ).context["page_obj"]
+            forward.append([post.pk for post in page])
+        backward = [[post.pk for post in page]]
+        while page.has_previous():
+            page = self.client.get(
+                url + "?cursor=" + page.previous_cursor
+            ).context["page_obj"]
+            backward.append([post.pk for post in page])
+        return forward, backward[::-1]
+
+    def test_cursor_pages_cover_every_listing(self):
+        """Курсоры обходят ленту без пропусков и повторов в обе стороны."""
+        expected = list(Post.objects.values_list("pk", flat=True))
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": "author"}),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                forward, backward = self.walk(url)
+                self.assertEqual([len(page) for page in forward], [10, 4])
+                self.assertEqual(sum(forward, []), expected)
+                self.assertEqual(backward, forward)
+
+    @override_settings(FOLLOW_FEED_MODE="materialized")
+    def test_cursor_pages_materialized_follow_feed(self):
+        call_command("rebuild_follow_feed", stdout=StringIO())
+        forward, backward = self.walk(reverse("posts:follow_index"))
+        self.assertEqual(
+            sum(forward, []), list(Post.objects.values_list("pk", flat=True))
+        )
+        self.assertEqual(backward, forward)
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.client.get(reverse("posts:index") + "?cursor=broken")
+        self.assertEqual(len(response.context["page_obj"]), 10)
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+
+class FeedQueryBudgetTest(TestCase):
+    """Число SQL-запросов ленты не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.follower = User.objects.create_user(username="follower")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        for post_num in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                author=cls.author,
+                text="Текст поста %s" % post_num,
+                group=cls.group,
+            )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.follower)
+
+    def test_listing_query_budget(self):
+        # Сессия и пользователь — два запроса на любой странице.
+        budgets = {
+            reverse("posts:index"): 4,
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}): 5,
+            reverse("posts:profile", kwargs={"username": "author"}): 6,
+            reverse("posts:follow_index"): 4,
+        }
+        for url, budget in budgets.items():
+            for page in ("", "?page=2"):
+                with self.subTest(url=url + page):
+                    # Первый запрос создаёт строки счётчиков.
+                    self.client.get(url + page)
+                    cache.clear()
+                    with self.assertNumQueries(budget):
+                        self.client.get(url + page)
+
+
+class SearchTest(TestCase):
+    """Поиск одинаково работает на обоих бэкендах."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.first = Post.objects.create(
+            author=cls.user,
+            text="Кошка спит на тёплом окне, а во дворе шумит осенний дождь",
+        )
+        cls.second = Post.objects.create(
+            author=cls.user, text="Кошка и кошка <b>гуляют</b> по окне"
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.first, author=cls.user, text="Какая сонная кошка"
+        )
+        for post_num in range(12):
+            Post.objects.create(author=cls.user, text="Собака %s" % post_num)
+
+    def search(self, query, cursor=None):
+        params = {"q": query}
+        if cursor:
+            params["cursor"] = cursor
+        return self.client.get(reverse("posts:search"), params)
+
+    def count(self, query):
+        return len(self.search(query).context["page_obj"])
+
+    def test_search_backends(self):
+        for backend in search.available_backends():
+            with self.subTest(backend=backend), override_settings(
+                SEARCH_BACKEND=backend
+            ):
+                call_command("rebuild_search_index", stdout=StringIO())
+                response = self.search("КОШКА окне")
+                found = [
+                    (result.kind, result.object_id)
+                    for result in response.context["page_obj"]
+                ]
+                # Все слова запроса обязательны, чаще встречающееся — выше.
+                self.assertEqual(
+                    found, [("post", self.second.pk), ("post", self.first.pk)]
+                )
+                self.assertContains(response, "<mark>Кошка</mark>")
+                self.assertNotContains(response, "<b>гуляют</b>")
+
+                response = self.search("сонная")
+                self.assertEqual(
+                    [r.post_id for r in response.context["page_obj"]],
+                    [self.first.pk],
+                )
+
+    def test_index_follows_changes(self):
+        for backend in search.available_backends():
+            with self.subTest(backend=backend), override_settings(
+                SEARCH_BACKEND=backend
+            ):
+                call_command("rebuild_search_index", stdout=StringIO())
+                post = Post.objects.create(author=self.user, text="Жираф")
+                self.assertEqual(self.count("жираф"), 1)
+                post.text = "Слон"
+                post.save()
+                self.assertEqual(self.count("жираф"), 0)
+                self.assertEqual(self.count("слон"), 1)
+                post.delete()
+                self.assertEqual(self.count("слон"), 0)
+
+    def test_results_are_paginated_by_cursor(self):
+        for backend in search.available_backends():
+            with self.subTest(backend=backend), override_settings(
+                SEARCH_BACKEND=backend
+            ):
+                call_command("rebuild_search_index", stdout=StringIO())
+                page_obj = self.search("собака").context["page_obj"]
+                self.assertEqual(len(page_obj), 10)
+                response = self.search("собака", page_obj.next_cursor)
+                self.assertEqual(len(response.context["page_obj"]), 2)
+                self.assertContains(response, "q=%D1%81%D0%BE")
+
+    def test_empty_query(self):
+        response = self.search("")
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        cls.user = User.objects.create_user(username="auth")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Текст поста", group=cls.group
+        )
+        Post.objects.create(author=cls.staff, text="Пост сотрудника")
+        Comment.objects.create(post=cls.post, author=cls.user, text="Ответ")
+        Follow.objects.create(user=cls.user, author=cls.staff)
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("posts:export"), params)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_is_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("posts:export"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_ndjson_export(self):
+        records = [
+            json.loads(line) for line in self.export().splitlines()
+        ]
+        self.assertEqual(
+            [record["type"] for record in records],
+            ["groups", "posts", "posts", "comments", "follows"],
+        )
+        self.assertEqual(records[1]["author"], "auth")
+        self.assertEqual(records[1]["group"], "test-slug")
+        self.assertEqual(records[3]["post"], self.post.pk)
+
+    def test_csv_export_with_filters(self):
+        rows = list(
+            csv.DictReader(
+                StringIO(
+                    self.export(format="csv", tables="posts", author="staff")
+                )
+            )
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["text"], "Пост сотрудника")
+        self.assertEqual(rows[0]["group"], "")
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command(
+            "export_yatube", "--tables", "comments", "--since", "2000-01-01",
+            stdout=out,
+        )
+        self.assertEqual(json.loads(out.getvalue())["text"], "Ответ")
+
+
+class ImportTest(TestCase):
+    def test_import_round_trip(self):
+        author = User.objects.create_user(username="author")
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        post = Post.objects.create(author=author, text="Пост", group=group)
+        Comment.objects.create(post=post, author=reader, text="Ответ")
+        Follow.objects.create(user=reader, author=author)
+        created = post.created
+        cases = [
+            (fmt, batch)
+            for fmt in ("ndjson", "csv")
+            # Пустой список — размер пачки по умолчанию.
+            for batch in (["--batch-size", "1"], [])
+        ]
+        for fmt, batch in cases:
+            with self.subTest(fmt=fmt, batch=batch), \
+                    tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f"dump.{fmt}")
+                call_command(
+                    "export_yatube", "--format", fmt, "--output", path,
+                    stdout=StringIO(),
+                )
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                Follow.objects.all().delete()
+                User.objects.exclude(username="author").delete()
+                call_command(
+                    "import_yatube", path, *batch, "--create-users",
+                    stdout=StringIO(),
+                )
+                post = Post.objects.get()
+                self.assertEqual(post.created, created)
+                self.assertEqual(post.group.slug, "test-slug")
+                self.assertEqual(post.comments.get().author.username, "reader")
+                self.assertTrue(
+                    Follow.objects.filter(
+                        user__username="reader", author=author
+                    ).exists()
+                )
+                self.assertEqual(counters.post_count(author_id=author.pk), 1)
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_and_compare_with_baseline(self):
+        out = StringIO()
+        call_command(
+            "seed_benchmark", "--users", "5", "--posts", "30",
+            "--follows", "10", "--comments", "5", stdout=out,
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 10)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            call_command(
+                "benchmark", "--iterations", "2", "--save-baseline", path,
+                stdout=StringIO(),
+            )
+            with open(path) as source:
+                baseline = json.load(source)
+            self.assertIn("index", baseline)
+            self.assertIn("follow_index", baseline)
+            self.assertEqual(baseline["index"]["status"], 200)
+            baseline["index"]["queries"] -= 1
+            with open(path, "w") as target:
+                json.dump(baseline, target)
+            with self.assertRaisesMessage(CommandError, "index"):
+                call_command(
+                    "benchmark", "--iterations", "2", "--baseline", path,
+                    stdout=StringIO(),
+                )
+
+    def test_render_times_with_and_without_template_cache(self):
+        call_command(
+            "seed_benchmark", "--users", "5", "--posts", "30",
+            "--follows", "10", stdout=StringIO(),
+        )
+        rows = benchmark.render_times(iterations=2)
+        self.assertIn("index", rows)
+        self.assertGreater(rows["index"]["plain"], 0)
+        self.assertGreater(rows["index"]["cached"], 0)
+
+    @skipUnless(connection.vendor == "sqlite", "планы SQLite")
+    def test_feed_pages_are_ordered_by_index(self):
+        call_command(
+            "seed_benchmark", "--users", "5", "--posts", "30",
+            "--follows", "10", "--groups", "2", stdout=StringIO(),
+        )
+        results = benchmark.run(
+            iterations=1,
+            only=["index", "group_list", "profile"],
+            explain=True,
+        )
+        self.assertEqual(set(results), {"index", "group_list", "profile"})
+        for name, result in results.items():
+            self.assertEqual(result["sorts"], 0, result["sorted"])
+
+
+class ConcurrentBenchmarkTest(TransactionTestCase):
+    def test_reads_under_write_load(self):
+        call_command(
+            "seed_benchmark", "--users", "5", "--posts", "30",
+            "--follows", "10", stdout=StringIO(),
+        )
+        phases = benchmark.concurrent(readers=2, writers=1, duration=0.5)
+        self.assertEqual(set(phases), {"read-only", "mixed"})
+        self.assertGreater(phases["read-only"]["reads_per_s"], 0)
+        self.assertEqual(phases["read-only"]["writes_per_s"], 0)
+        self.assertGreater(phases["mixed"]["reads_per_s"], 0)
+        self.assertGreater(phases["mixed"]["writes_per_s"], 0)
@@ -0,0 +1,107 @@
+"""
+Миниатюры и варианты картинок постов.
+
+Картинка уменьшается не во время запроса, а в локальном пуле потоков
+после фиксации транзакции. Готовые адрес и размеры миниатюры и список
+вариантов (posts.images) записываются в пост; пока их нет, шаблоны
+выводят исходную картинку. Они же запоминаются в StoredImage файла
+(posts.storage): другие посты с той же картинкой их только копируют.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from . import cards, images
+from .models import Post, StoredImage
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = "960x339"
+OPTIONS = {"crop": "center", "upscale": True}
+FIELDS = (
+    "thumbnail_url",
+    "thumbnail_width",
+    "thumbnail_height",
+    "image_variants",
+)
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def reset(post: Post) -> None:
+    """Забывает миниатюру поста, у которого сменилась картинка."""
+    post.thumbnail_url = ""
+    post.thumbnail_width = None
+    post.thumbnail_height = None
+    post.image_variants = ""
+
+
+def generate(post_id: int, force=False) -> None:
+    """
+    Готовит миниатюру поста и сохраняет её адрес и размеры. Без force
+    берёт готовые, если они уже есть у файла картинки.
+    """
+    try:
+        post = Post.objects.only("image").filter(pk=post_id).first()
+        if post is None or not post.image:
+            return
+        name = post.image.name
+        stored = StoredImage.objects.filter(name=name)
+        fields = None
+        if not force:
+            fields = stored.exclude(thumbnail_url="").values(*FIELDS).first()
+        if fields is None:
+            thumbnail = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+            variants = images.build_variants(post.image)
+            fields = {
+                "thumbnail_url": thumbnail.url,
+                "thumbnail_width": thumbnail.width,
+                "thumbnail_height": thumbnail.height,
+                "image_variants": images.dumps(variants),
+            }
+            stored.update(**fields)
+        # Условие по image: пока воркер работал, картинку могли заменить.
+        Post.objects.filter(pk=post_id, image=name).update(**fields)
+        cards.bump(post_id)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюру поста %s", post_id)
+
+
+def delete(name: str, storage) -> None:
+    """Удаляет миниатюры файла name, которые помнит sorl."""
+    default.kvstore.delete(ImageFile(name, storage))
+
+
+def _run_in_worker(post_id: int) -> None:
+    try:
+        generate(post_id)
+    finally:
+        # Соединения с базой у потоков пула свои: не держим их открытыми.
+        connections.close_all()
+
+
+def _submit(post_id: int) -> None:
+    if settings.THUMBNAIL_ASYNC:
+        get_executor().submit(_run_in_worker, post_id)
+    else:
+        generate(post_id)
+
+
+def schedule(post: Post) -> None:
+    """Ставит миниатюру в очередь после фиксации текущей транзакции."""
+    if post.image:
+        transaction.on_commit(lambda: _submit(post.pk))
@@ -0,0 +1,152 @@
+"""
+Загрузка картинок постов с ограничениями на каждом шаге.
+
+1. LimitedUploadHandler (FILE_UPLOAD_HANDLERS) пишет файл из запроса
+   во временный файл кусками и перестаёт писать, когда файл вырос за
+   IMAGE_UPLOAD_MAX_SIZE: в памяти не бывает больше одного куска.
+2. check() по размеру и заголовку картинки, не декодируя её, отсекает
+   слишком большие файлы, неподдерживаемые форматы и картинки больше
+   IMAGE_MAX_SIDE по стороне или IMAGE_MAX_PIXELS пикселей.
+3. reencode() в пуле из IMAGE_WORKERS потоков пересохраняет картинку
+   без EXIF и прочих метаданных, с учётом поворота из EXIF. Пул
+   ограничивает число картинок, которые процесс декодирует одновременно.
+   Запрос ждёт результата не дольше IMAGE_REENCODE_WAIT секунд, но поток
+   прервать нельзя: начатое декодирование доработает в пуле, и время его
+   ограничено только проверками check().
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Параметры сохранения по форматам; icc_profile передаётся отдельно.
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 90},
+    "PNG": {"optimize": True},
+    "GIF": {},
+    "WEBP": {"quality": 90},
+}
+# Что из Image.info нужно для правильного вывода, а не описывает снимок.
+KEPT_INFO = ("transparency", "duration", "loop", "background")
+
+_executor = None
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Временный файл, в который пишется не больше лимита."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        # Остаток запроса читается, но не хранится. Размер файла
+        # (file_complete) остаётся настоящим, и check() его отклонит.
+        if self.received <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix="uploads",
+        )
+    return _executor
+
+
+def check(upload) -> None:
+    """Проверяет размер и заголовок картинки, не декодируя её."""
+    if upload.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            "Файл больше %s."
+            % filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE),
+            code="file_too_large",
+        )
+    too_many_pixels = ValidationError(
+        "В картинке слишком много точек.", code="image_too_large"
+    )
+    try:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            image_format = image.format
+            width, height = image.size
+            frames = getattr(image, "n_frames", 1)
+    except Image.DecompressionBombError:
+        raise too_many_pixels
+    except Exception:
+        # Не картинка: об этом скажет ImageField.
+        return
+    finally:
+        upload.seek(0)
+    if image_format not in settings.IMAGE_UPLOAD_FORMATS:
+        raise ValidationError(
+            f"Формат {image_format} не поддерживается.",
+            code="image_format",
+        )
+    if max(width, height) > settings.IMAGE_MAX_SIDE:
+        raise ValidationError(
+            f"Картинка больше {settings.IMAGE_MAX_SIDE} точек по стороне.",
+            code="image_too_large",
+        )
+    if width * height * frames > settings.IMAGE_MAX_PIXELS:
+        raise too_many_pixels
+
+
+def _reencode(upload) -> File:
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        animated = getattr(image, "is_animated", False)
+        icc_profile = image.info.get("icc_profile")
+        if not animated:
+            # Поворот из EXIF применяется к точкам: сам EXIF не сохраняется.
+            image = ImageOps.exif_transpose(image)
+        image.info = {
+            key: value
+            for key, value in image.info.items()
+            if key in KEPT_INFO
+        }
+        if image_format == "JPEG" and image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+        options = dict(
+            SAVE_OPTIONS.get(image_format, {}), icc_profile=icc_profile
+        )
+        if animated:
+            options["save_all"] = True
+        result = File(
+            tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+            name=upload.name,
+        )
+        image.save(result, image_format, **options)
+    result.seek(0, os.SEEK_END)
+    result.size = result.tell()
+    result.seek(0)
+    return result
+
+
+def reencode(upload) -> File:
+    """Копия картинки без метаданных, пересохранённая в пуле потоков."""
+    future = get_executor().submit(_reencode, upload)
+    try:
+        return future.result(timeout=settings.IMAGE_REENCODE_WAIT)
+    except TimeoutError:
+        # Снимает картинку с очереди пула, если до неё ещё не дошло;
+        # начатую обработку не останавливает.
+        future.cancel()
+        raise ValidationError(
+            "Картинка обрабатывается слишком долго, попробуйте ещё раз.",
+            code="image_timeout",
+        )
+    except Exception:
+        raise ValidationError(
+            "Не удалось обработать картинку.", code="invalid_image"
+        )
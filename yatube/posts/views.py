@@ -1,17 +1,60 @@
+from core.decorators import cache_validators, retry_when_locked
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.db.models import Max
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView
 
-from .forms import CommentForm, PostForm
+from . import counters, export, feed, search
+from .forms import CommentForm, ExportForm, PostForm
 from .models import Follow, Group, Post
+from .pagination import CursorPaginator, PaginationMixin, paginate
 
 POST_PER_PAGE = 10
 
 
-class PostHome(ListView):
+def _newest_created(queryset):
+    return queryset.order_by("-created").values_list("created", flat=True)[:1]
+
+
+def index_last_modified(request):
+    return _newest_created(Post.objects.all()).first()
+
+
+def group_last_modified(request, slug):
+    return _newest_created(Post.objects.filter(group__slug=slug)).first()
+
+
+def profile_last_modified(request, username):
+    return _newest_created(
+        Post.objects.filter(author__username=username)
+    ).first()
+
+
+def post_last_modified(request, post_id):
+    row = (
+        Post.objects.filter(pk=post_id)
+        .annotate(last_comment=Max("comments__created"))
+        .values_list("created", "last_comment")
+        .first()
+    )
+    if row is None:
+        return None
+    return max(date for date in row if date is not None)
+
+
+@method_decorator(cache_validators(index_last_modified), name="dispatch")
+class PostHome(PaginationMixin, ListView):
     """Главная страница."""
 
     paginate_by = POST_PER_PAGE
@@ -20,10 +63,14 @@ class PostHome(ListView):
     context_object_name = "posts"
 
     def get_queryset(self):
-        return Post.objects.all()
+        return feed.index_posts()
+
+    def get_count(self):
+        return counters.post_count()
 
 
-class GroupPosts(ListView):
+@method_decorator(cache_validators(group_last_modified), name="dispatch")
+class GroupPosts(PaginationMixin, ListView):
     """Страница группы."""
 
     paginate_by = POST_PER_PAGE
@@ -32,56 +79,98 @@ class GroupPosts(ListView):
     context_object_name = "posts"
 
     def get_queryset(self):
-        group = get_object_or_404(Group, slug=self.kwargs["slug"])
-        return Post.objects.filter(group=group)
+        self.group = get_object_or_404(Group, slug=self.kwargs["slug"])
+        return feed.group_posts(self.group)
+
+    def get_count(self):
+        return counters.post_count(group_id=self.group.pk)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["title"] = str(context["posts"][0].group)
-        context["description"] = context["posts"][0].group.description
+        context["group"] = self.group
+        context["title"] = self.group.title
+        context["description"] = self.group.description
         return context
 
 
+@cache_validators(profile_last_modified)
 def profile(request: HttpRequest, username: str) -> HttpResponse:
     """Страница профиля."""
     author = get_object_or_404(User, username=username)
-    posts_author = author.posts.all()
+    posts_author = feed.author_posts(author)
+    posts_count = counters.post_count(author_id=author.pk)
     following = author.following.all().exists()
-    paginator = Paginator(posts_author, POST_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts_author, POST_PER_PAGE, posts_count)
     template = "posts/profile.html"
     context = {
         "author": author,
-        "posts_author": posts_author,
+        "posts_count": posts_count,
         "page_obj": page_obj,
         "following": following,
     }
     return render(request, template, context)
 
 
+@cache_validators(post_last_modified)
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
     """Страница записи."""
-    post_info = get_object_or_404(Post, pk=post_id)
-    author_post = post_info.author_id
-    count_author_posts = (
-        Post.objects.select_related("author")
-        .filter(author_id=author_post)
-        .count()
+    post_info = get_object_or_404(
+        Post.objects.select_related("author", "group"), pk=post_id
     )
-    comments = post_info.comments.all()
+    count_author_posts = counters.post_count(author_id=post_info.author_id)
+    count_comments = counters.comment_count(post_info.pk)
+    comments = CursorPaginator(
+        feed.post_comments(post_info.pk), settings.COMMENTS_PER_PAGE
+    ).get_page()
     form = CommentForm()
     template = "posts/post_detail.html"
     context = {
         "post_info": post_info,
         "count_author_posts": count_author_posts,
+        "count_comments": count_comments,
         "form": form,
         "comments": comments,
     }
     return render(request, template, context)
 
 
+def comment_list(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Следующая порция комментариев поста (HTML-фрагмент)."""
+    post_info = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    comments = CursorPaginator(
+        feed.post_comments(post_info.pk), settings.COMMENTS_PER_PAGE
+    ).get_page(request.GET.get("cursor"))
+    template = "posts/includes/comment_list.html"
+    context = {
+        "post_info": post_info,
+        "comments": comments,
+    }
+    return render(request, template, context)
+
+
+def search_posts(request: HttpRequest) -> HttpResponse:
+    """Поиск по постам и комментариям."""
+    query = request.GET.get("q", "").strip()
+    page_obj = search.search(query, request.GET.get("cursor"), POST_PER_PAGE)
+    posts = Post.objects.select_related("author").in_bulk(
+        {result.post_id for result in page_obj}
+    )
+    results = [
+        (result, posts[result.post_id])
+        for result in page_obj
+        if result.post_id in posts
+    ]
+    template = "posts/search.html"
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "results": results,
+    }
+    return render(request, template, context)
+
+
 @login_required
+@retry_when_locked
 def post_create(request: HttpRequest) -> HttpResponse:
     """Создание нового поста."""
     form = PostForm(
@@ -92,6 +181,8 @@ def post_create(request: HttpRequest) -> HttpResponse:
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        form.schedule_thumbnail(post)
+        feed.fan_out(post)
         return redirect("posts:profile", username=post.author.username)
 
     template = "posts/create_post.html"
@@ -102,6 +193,7 @@ def post_create(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@retry_when_locked
 def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     """Редактирование поста."""
     post = get_object_or_404(Post, pk=post_id)
@@ -114,6 +206,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     )
     if form.is_valid():
         form.save()
+        form.schedule_thumbnail(post)
         return redirect("posts:post_detail", post_id=post.pk)
 
     template = "posts/create_post.html"
@@ -126,6 +219,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
 
 
 @login_required
+@retry_when_locked
 def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -143,10 +237,8 @@ def follow_index(request: HttpRequest) -> HttpResponse:
     """
     Страница всех постов авторов, на которых подписан текущий пользователь.
     """
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, POST_PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = feed.follow_posts(request.user)
+    page_obj = paginate(request, posts, POST_PER_PAGE)
     template = "posts/follow.html"
     context = {
         "page_obj": page_obj,
@@ -155,21 +247,44 @@ def follow_index(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@retry_when_locked
 def profile_follow(request: HttpRequest, username: str) -> HttpResponse:
     # Подписаться на автора
     current_user = request.user
     author = get_object_or_404(User, username=username)
     if author != current_user:
-        Follow.objects.get_or_create(user=current_user, author=author)
+        _, created = Follow.objects.get_or_create(
+            user=current_user, author=author
+        )
+        if created:
+            feed.backfill(current_user, author)
         return redirect("posts:profile", username=username)
     return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
 
 @login_required
+@retry_when_locked
 def profile_unfollow(request: HttpRequest, username: str) -> HttpResponse:
     # Дизлайк, отписка
     current_user = request.user
-    Follow.objects.filter(
-        user=current_user, author__username=username
-    ).delete()
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=current_user, author=author).delete()
+    feed.prune(current_user, author)
     return redirect("posts:profile", username=username)
+
+
+@staff_member_required
+def export_data(request: HttpRequest) -> HttpResponse:
+    """Потоковая выгрузка данных в NDJSON или CSV (только для персонала)."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = dict(form.cleaned_data)
+    fmt = filters.pop("format")
+    tables = filters.pop("tables")
+    response = StreamingHttpResponse(
+        export.lines(fmt, tables, **filters),
+        content_type=export.CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="yatube.{fmt}"'
+    return response
@@ -0,0 +1,24 @@
+"""
+Настройки по профилям: base — общее, dev — разработка, test — тесты,
+prod — боевой сервер. Профиль выбирается переменной окружения
+YATUBE_ENV (по умолчанию dev); DJANGO_SETTINGS_MODULE может указать
+модуль профиля и напрямую, например yatube.settings.prod.
+Производительность боевого профиля проверяет
+`manage.py check --deploy --tag performance`.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+YATUBE_ENV = os.getenv("YATUBE_ENV", "dev")
+
+if YATUBE_ENV == "dev":
+    from .dev import *  # noqa: F401,F403
+elif YATUBE_ENV == "test":
+    from .test import *  # noqa: F401,F403
+elif YATUBE_ENV == "prod":
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"Неизвестный профиль YATUBE_ENV={YATUBE_ENV!r}: dev, test или prod"
+    )
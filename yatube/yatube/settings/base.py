@@ -0,0 +1,368 @@
+"""
+Django settings for yatube project: общие для всех профилей.
+
+Профили dev, test и prod (yatube.settings) дополняют эти настройки.
+Значения по умолчанию здесь — боевые: отладка выключена, шаблоны
+кэшируются, соединения с базой постоянные.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.getenv("SECRET_KEY")
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    "127.0.0.1",
+    "localhost",
+    "testserver",
+    "www.iricshkin.pythonanywhere.com",
+    "iricshkin.pythonanywhere.com",
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "posts.apps.PostsConfig",
+    "users.apps.UsersConfig",
+    "core.apps.CoreConfig",
+    "api.apps.ApiConfig",
+    "sorl.thumbnail",
+]
+
+MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.AnonymousCacheMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "yatube.urls"
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+
+def template_settings(cached):
+    """
+    TEMPLATES проекта. Кэширующий загрузчик разбирает каждый шаблон один
+    раз на процесс, но правки шаблонов без перезапуска не видны.
+    """
+    options = {
+        "context_processors": [
+            "django.template.context_processors.debug",
+            "django.template.context_processors.request",
+            "django.contrib.auth.context_processors.auth",
+            "django.contrib.messages.context_processors.messages",
+            "core.context_processors.year.year",
+        ],
+    }
+    if cached:
+        options["loaders"] = [
+            ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)
+        ]
+    return [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [TEMPLATES_DIR],
+            "APP_DIRS": not cached,
+            "OPTIONS": options,
+        },
+    ]
+
+
+# Запуск через yatube.wsgi заранее разбирает все шаблоны из TEMPLATES_DIR.
+TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "1") == "1"
+TEMPLATES = template_settings(TEMPLATE_CACHE)
+
+WSGI_APPLICATION = "yatube.wsgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# DB_ENGINE: "sqlite" (файл BASE_DIR/db.sqlite3) или "postgresql"; для
+# PostgreSQL нужен psycopg2. CONN_MAX_AGE держит соединение между
+# запросами. DB_POOLER=pgbouncer — если соединения идут через pgbouncer в
+# режиме transaction: серверные курсоры там не работают.
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+DB_POOLER = os.getenv("DB_POOLER", "")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "yatube"),
+            "USER": os.getenv("DB_USER", "yatube"),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", ""),
+            "PORT": os.getenv("DB_PORT", ""),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "DISABLE_SERVER_SIDE_CURSORS": DB_POOLER == "pgbouncer",
+            "OPTIONS": {
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+                "application_name": "yatube",
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv(
+                "DB_NAME", os.path.join(BASE_DIR, "db.sqlite3")
+            ),
+            # Кэш страниц SQLite живёт в соединении: держим его открытым.
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "OPTIONS": {
+                # Сколько секунд ждать чужую запись (busy_timeout).
+                "timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "10")),
+            },
+        }
+    }
+
+# PRAGMA, которые core.sqlite выполняет на каждом новом соединении с
+# SQLite. WAL не блокирует читателей во время записи; synchronous=NORMAL
+# в режиме WAL не теряет целостность, только последние транзакции при
+# сбое питания. cache_size со знаком минус — в КиБ.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", str(64 * 1024))),
+    "temp_store": "memory",
+}
+# Сколько раз повторять пишущую транзакцию представления, если база
+# занята ("database is locked"); пауза между попытками растёт вдвое.
+DB_LOCK_RETRIES = int(os.getenv("DB_LOCK_RETRIES", "3"))
+DB_LOCK_RETRY_DELAY = float(os.getenv("DB_LOCK_RETRY_DELAY", "0.05"))
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = "ru-RU"  # "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = False
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = "/static/"
+
+STATICFILES_DIRS = [os.path.join(BASE_DIR, "yatube", "static")]
+STATIC_ROOT = os.path.join(
+    BASE_DIR, 'static/'
+)  # папка, в которой будет лежать статика
+
+LOGIN_URL = "users:login"
+LOGIN_REDIRECT_URL = "posts:index"
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+#  подключаем движок filebased.EmailBackend
+EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# указываем директорию, в которую будут складываться файлы писем
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+CSRF_FAILURE_VIEW = "core.views.csrf_failure"
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# core.staticserve.StaticFilesMiddleware (профиль prod) отдаёт статику и
+# медиа из процесса; STATIC_SERVE=0 — если их раздаёт веб-сервер. Файлы с
+# хешем в имени кэшируются навсегда, остальные — на столько секунд.
+STATIC_SERVE = os.getenv("STATIC_SERVE", "1") == "1"
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 60 * 60))
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", 60 * 60))
+
+# Кэш выбирается переменной окружения CACHE_BACKEND:
+#   locmem    — память процесса; у каждого воркера gunicorn свой кэш;
+#   file      — общий для всех воркеров каталог CACHE_LOCATION;
+#   db        — общая таблица CACHE_LOCATION в основной базе (для SQLite —
+#               тот же файл); создаётся командой createcachetable;
+#   memcached — сервер memcached по адресу CACHE_LOCATION.
+CACHE_BACKENDS = {
+    "locmem": (
+        "django.core.cache.backends.locmem.LocMemCache",
+        "",
+    ),
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        os.path.join(tempfile.gettempdir(), "yatube_cache"),
+    ),
+    "db": (
+        "django.core.cache.backends.db.DatabaseCache",
+        "yatube_cache",
+    ),
+    "memcached": (
+        "django.core.cache.backends.memcached.MemcachedCache",
+        "127.0.0.1:11211",
+    ),
+}
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", CACHE_BACKENDS[CACHE_BACKEND][1]
+        ),
+        "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "yatube"),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 300)),
+        "OPTIONS": {
+            # Карточки постов кэшируются поштучно: 300 записей по умолчанию
+            # хватает лишь на несколько страниц.
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+        },
+    }
+}
+
+# Лента подписок /follow/: "join" — соединение Follow и Post на каждый
+# запрос, "materialized" — заранее разложенная лента (posts.FeedItem).
+# После переключения на "materialized" выполните rebuild_follow_feed.
+FOLLOW_FEED_MODE = os.getenv("FOLLOW_FEED_MODE", "join")
+
+# Постраничный вывод лент: "page" — номера страниц (?page=), "cursor" —
+# курсоры по ключу (-created, -pk) (?cursor=) без COUNT(*) и OFFSET.
+POSTS_PAGINATION = os.getenv("POSTS_PAGINATION", "page")
+
+# Сколько комментариев выводить под постом и подгружать за раз.
+COMMENTS_PER_PAGE = int(os.getenv("COMMENTS_PER_PAGE", 20))
+
+# Сколько секунд хранить в кэше отрисованную карточку поста. Правка и
+# удаление поста, переименование автора и правка группы сбрасывают её
+# сразу (posts.cards); срок только освобождает место в кэше.
+POST_CARD_CACHE_TIMEOUT = int(os.getenv("POST_CARD_CACHE_TIMEOUT", 60 * 60))
+
+# Миниатюры картинок постов готовит пул из THUMBNAIL_WORKERS потоков;
+# при THUMBNAIL_ASYNC=0 — сразу после сохранения, в том же запросе.
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+THUMBNAIL_ASYNC = os.getenv("THUMBNAIL_ASYNC", "1") == "1"
+
+# Загрузка картинок постов (posts.uploads): файл пишется на диск, не
+# больше IMAGE_UPLOAD_MAX_SIZE байт; картинки больше IMAGE_MAX_SIDE точек
+# по стороне или IMAGE_MAX_PIXELS точек (все кадры) отклоняются по
+# заголовку; пересохранение без метаданных — в пуле из IMAGE_WORKERS
+# потоков. Запрос ждёт его не дольше IMAGE_REENCODE_WAIT секунд, но уже
+# начатое декодирование не прерывается: его время ограничивают размеры.
+FILE_UPLOAD_HANDLERS = ["posts.uploads.LimitedUploadHandler"]
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv("IMAGE_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+IMAGE_UPLOAD_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", 8000))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_REENCODE_WAIT = int(os.getenv("IMAGE_REENCODE_WAIT", 30))
+
+# Ширины вариантов картинки поста для srcset.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+
+# Полнотекстовый поиск: "fts5" — виртуальная таблица SQLite FTS5,
+# "postgres" — to_tsvector по GIN-индексам PostgreSQL, "inverted" —
+# инвертированный индекс в таблице posts.SearchPosting, "auto" — первый
+# доступный из них. После смены бэкенда или загрузки данных в обход
+# моделей выполните rebuild_search_index.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# Сколько секунд браузер и прокси могут отдавать анонимам страницы лент и
+# постов без проверки; дальше — условный запрос с If-Modified-Since.
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 60))
+
+# Замеры запросов (core.metrics): гистограммы для /metrics и, если задан
+# METRICS_LOG_FILE, JSON-строка на запрос в ротируемом логе.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_LOG_FILE = os.getenv("METRICS_LOG_FILE", "")
+# Токен сборщика метрик (Authorization: Bearer ...); пустой — только персонал.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "metrics": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": METRICS_LOG_FILE,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "formatter": "message",
+        }
+        if METRICS_LOG_FILE
+        else {"class": "logging.NullHandler"},
+    },
+    "loggers": {
+        "yatube.metrics": {
+            "handlers": ["metrics"],
+            "level": "INFO" if METRICS_LOG_FILE else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Журнал медленных запросов (core.slowlog): запросы дольше SLOW_QUERY_MS
+# миллисекунд попадают в core.SlowQuery вместе с планом выполнения.
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
@@ -0,0 +1,15 @@
+"""Разработка: отладка, debug_toolbar, шаблоны перечитываются с диска."""
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE, os, template_settings
+
+DEBUG = os.getenv("DEBUG", "1") == "1"
+
+INTERNAL_IPS = [
+    "127.0.0.1",
+]
+
+INSTALLED_APPS = INSTALLED_APPS + ["debug_toolbar"]
+MIDDLEWARE = MIDDLEWARE + ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
+TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "0") == "1"
+TEMPLATES = template_settings(TEMPLATE_CACHE)
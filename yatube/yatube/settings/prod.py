@@ -0,0 +1,42 @@
+"""
+Боевой сервер: без отладки и debug_toolbar, статика с хешами в именах
+и сжатыми копиями (collectstatic), раздача статики и медиа из процесса,
+кэширующий загрузчик шаблонов, постоянные соединения с
+базой (DB_CONN_MAX_AGE), общий кэш и сжатие ответов (brotli, если
+установлен пакет brotli, иначе gzip).
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import CACHE_BACKENDS, CACHES, MIDDLEWARE, SECRET_KEY, os
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("Задайте SECRET_KEY в окружении")
+
+DEBUG = False
+
+# Имена файлов статики с хешем содержимого (браузеры кэшируют их
+# навсегда) и сжатые копии .gz/.br рядом с ними.
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+
+# Статика отдаётся раньше всех остальных middleware. Сжатие ответов —
+# сразу за замерами: они учитывают и его время.
+MIDDLEWARE = (
+    ["core.staticserve.StaticFilesMiddleware"]
+    + MIDDLEWARE[:1]
+    + ["core.middleware.CompressionMiddleware"]
+    + MIDDLEWARE[1:]
+)
+
+# Кэш в памяти процесса у каждого воркера свой; по умолчанию — общий для
+# всех воркеров каталог.
+if "CACHE_BACKEND" not in os.environ:
+    CACHE_BACKEND = "file"
+    CACHES = {
+        **CACHES,
+        "default": {
+            **CACHES["default"],
+            "BACKEND": CACHE_BACKENDS["file"][0],
+            "LOCATION": os.getenv("CACHE_LOCATION", CACHE_BACKENDS["file"][1]),
+        },
+    }
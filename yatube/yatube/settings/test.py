@@ -0,0 +1,18 @@
+"""Тесты: без отладочных инструментов и с быстрым хешем паролей."""
+from .base import *  # noqa: F401,F403
+from .base import os, template_settings
+
+SECRET_KEY = os.getenv("SECRET_KEY") or "test"
+
+# Надёжный хеш паролей в тестах только тратит время на create_user.
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# Тесты проверяют отрисовку шаблонов, а не кэш загрузчика.
+TEMPLATE_CACHE = False
+TEMPLATES = template_settings(TEMPLATE_CACHE)
+
+# Миниатюры — в том же потоке: воркер пула не должен писать в базу,
+# пока тест её очищает.
+THUMBNAIL_ASYNC = False